@@ -1,11 +1,60 @@
+import codecs
+import collections
+import copy
 import datetime
+import gc
+import hashlib
+import itertools
 import json
+import marshal
+import math
+import mmap
+import os
+import re
 import shutil
-from operator import itemgetter
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from operator import eq, ge, gt, itemgetter, le, lt
 from pathlib import Path
-from typing import Literal, List, Union
+from typing import Callable, Literal, List, Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 _save_path = "autodex_data.json"
+_indexed_magic = b"ADEX"
+_indexed_prefix = struct.Struct("<4sHBBQQII")
+_indexed_entry = struct.Struct("<qQQ")
+_indexed_hash_size = 32
+_json_decoder = json.JSONDecoder()
+_json_whitespace = re.compile(r"[ \t\n\r]*")
+_warm_magic = b"ADXW"
+_warm_prefix = struct.Struct("<4sHBBQQ32s")
+_warm_version = 2  # Must be raised whenever an index or a check changes, so old warm caches aren't used
+_warm_indexes = ("timestamps", "_created_index", "_touched_index", "_cells", "_layer_counts", "_footprints",
+                 "_completions", "_completion_keys", "_numeric", "_numeric_keys", "_stats_keys", "_cusocos_by_name",
+                 "_name_keys", "_postings", "_posting_keys")
+_snapshot_magic = b"ADXS"
+_snapshot_prefix = struct.Struct("<4sHHI")
+_snapshot_string_fields = ("Storage unit", "Container type", "Name", "Description", "F3D folder path", "Date created",
+                           "Date changed")
+_snapshot_list_fields = ("Contents", "Tags", "Image paths")
+_snapshot_streams = (("Layout", "Cusoco") + _snapshot_string_fields + _snapshot_list_fields
+                     + tuple(f"{key} count" for key in _snapshot_list_fields)
+                     + ("Location count", "Location keys", "Location values",
+                        "Numeric count", "Numeric names", "Numeric unit count", "Numeric units", "Numeric value count",
+                        "Numeric kinds", "Numeric ints",
+                        "Categorical count", "Categorical names", "Categorical value count", "Categorical values"))
+_conversion_operations = {"+", "-", "*", "/"}
+_image_extensions = (".png", ".jpg", ".jpeg", ".gif", ".tif", ".tiff", ".webp", ".bmp", ".svg")
 
 _template_soda = {
     "Cusoco": int,
@@ -32,8 +81,11 @@ _template_header = {
     "Unit conversions": dict,
     "Numeric attributes": dict
 }
-_global_fida = []
-_global_header = {}
+_unit_registries = {}
+_query_comparisons = {"=": eq, "<": lt, "<=": le, ">": gt, ">=": ge}
+_query_fields = ("Cusoco", "Storage unit", "Container type", "Name", "Description", "Contents", "Tags",
+                 "Date created", "Date changed")
+_query_sort_fields = ("Cusoco", "Name", "Date created", "Date changed")
 
 
 class AutodexException(Exception):
@@ -42,15 +94,8 @@ class AutodexException(Exception):
     pass
 
 
-def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
-    """Check if a soda is valid, without taking stored sodas into consideration"""
-
-    if header is None:
-        header = _global_header.copy()
-
-    date_format = header["Date format"]
-    container_types = header["Container types"]
-    storage_units = header["Storage units"]
+def _soda_structure_check(soda: dict) -> [None, str]:
+    """Checks type, keys and value types of a soda. The other soda checks rely on these"""
 
     if type(soda) is not dict:
         return f"E014 Soda must be dict, not {type(soda)}"
@@ -77,30 +122,29 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
         if type(value) is not _template_soda[key]:
             return f"E016 {key} value data type must be {_template_soda[key]}, not {type(value)}"
 
-    # region Name
 
+def _soda_name_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     if not soda["Name"].strip():
         return "E017 Name mustn't be empty"
 
-    # endregion
-    # region Cusoco
 
+def _soda_cusoco_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     soda_cusoco = soda["Cusoco"]
 
     if soda_cusoco < 1:
         return f"E018 Cusoco must be greater than 0, not {soda_cusoco}"
 
-    # endregion
-    # region Storage unit
 
+def _soda_storage_unit_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     soda_storage_unit = soda["Storage unit"]
 
-    if soda_storage_unit not in storage_units.keys():
+    if soda_storage_unit not in header["Storage units"].keys():
         return f"E019 Storage unit {soda_storage_unit} isn't listed in file header"
 
-    # endregion
-    # region Container type
 
+def _soda_container_type_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
+    container_types = header["Container types"]
+    soda_storage_unit = soda["Storage unit"]
     soda_container_type = soda["Container type"]
 
     if soda_container_type not in container_types.keys():
@@ -110,29 +154,26 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
         return (f"E021 Storage unit {soda_storage_unit} is incompatible with container type"
                 f" {soda_container_type}")
 
-    # endregion
-    # region Contents, Tags, Image paths
 
-    for key in ("Contents", "Tags", "Image paths"):
+def _soda_strings_check(soda: dict, key: str) -> [None, str]:
+    """Checks Contents, Tags or Image paths"""
 
-        seen = []
-        soda_key = soda[key]
-        for i in soda_key:
+    seen = []
+    for i in soda[key]:
 
-            if type(i) is not str:
-                return f"E022 {key} must only contain str, not {type(i)}"
+        if type(i) is not str:
+            return f"E022 {key} must only contain str, not {type(i)}"
 
-            if i in seen:
-                return f"E023 {key} mustn't contain duplicates: {i}"
+        if i in seen:
+            return f"E023 {key} mustn't contain duplicates: {i}"
 
-            if not i.strip():
-                return f"E024 {key} mustn't contain empty items"
+        if not i.strip():
+            return f"E024 {key} mustn't contain empty items"
 
-            seen.append(i)
+        seen.append(i)
 
-    # endregion
-    # region Numeric attributes
 
+def _soda_numeric_attributes_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     for key, value in soda["Numeric attributes"].items():
 
         if type(value) is not dict:
@@ -170,9 +211,8 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
 
                 seen.append(j)
 
-    # endregion
-    # region Categorical attributes
 
+def _soda_categorical_attributes_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     for key, value in soda["Categorical attributes"].items():
 
         if type(value) is not list:
@@ -192,20 +232,18 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
 
             seen.append(i)
 
-    # endregion
-    # region Image paths
 
+def _soda_image_paths_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     for i in soda["Image paths"]:
 
         if not Path(i).exists():
             return f"E037 Image path not found: {i}"
 
-        if not i.endswith((".png", ".jpg", ".jpeg", ".gif", ".tif", ".tiff", ".webp", ".bmp", ".svg")):
+        if not i.endswith(_image_extensions):
             return f"E038 Image path must lead to an image type file: {i}"
 
-    # endregion
-    # region F3D folder path
 
+def _soda_f3d_folder_path_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
     soda_f3d_folder_path = soda["F3D folder path"]
 
     if soda_f3d_folder_path:
@@ -228,19 +266,24 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
                 if j.is_dir():
                     return f"E042 F3D image group contains folders: {str(path.absolute())}"
 
-                if not str(j).endswith((".png", ".jpg", ".jpeg", ".gif", ".tif", ".tiff", ".webp", ".bmp", ".svg")):
+                if not str(j).endswith(_image_extensions):
                     return f"E043 F3D image group contains non-image type file: {str(path.absolute())}"
 
-    # endregion
-    # region Location
 
-    limits = storage_units[soda_storage_unit]
-    size = container_types[soda_container_type][soda_storage_unit]
+def _soda_location_check(soda: dict, header: dict, now: datetime.datetime) -> [None, str]:
+    soda_storage_unit = soda["Storage unit"]
+
+    limits = header["Storage units"][soda_storage_unit]
+    size = header["Container types"][soda["Container type"]][soda_storage_unit]
     location = soda["Location"]
 
     if limits.keys() != location.keys():
         return f"E044 Invalid location keys"
 
+    for key, value in location.items():
+        if type(value) is not int:
+            return f"E046 Location {key} must be int, not {type(value)}"
+
     location_plus_size = location.copy()
 
     for key, value in size.items():
@@ -250,8 +293,6 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
         key_limits = limits[key]
         if value < key_limits[0] or value > key_limits[1]:
             return f"E045 Base location out of bounds: {key}: {value} doesn't fit in {key_limits}"
-        if type(value) is not int:
-            return f"E046 Location {key} must be int, not {type(value)}"
 
     for key, value in location_plus_size.items():
         key_limits = limits[key]
@@ -259,8 +300,10 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
             return (f"E047 Location combined with container size out of bounds: {key}: {value} doesn't fit in"
                     f" {key_limits}")
 
-    # endregion
-    # region Date created
+
+def _soda_date_created_check(soda: dict, header: dict, now: datetime.datetime,
+                             epochs: [dict, None] = None) -> [None, str]:
+    """Also puts the date as epoch seconds into epochs, if given, so it doesn't have to be parsed again"""
 
     soda_date_created = soda["Date created"]
 
@@ -268,45 +311,94 @@ def standalone_check(soda: dict, header: [dict, None] = None) -> [None, str]:
         return "E048 Creation date mustn't be empty"
 
     try:
-        date_created = datetime.datetime.strptime(soda_date_created, date_format)
+        date_created = datetime.datetime.strptime(soda_date_created, header["Date format"])
 
     except ValueError:
         return f"E049 Invalid creation date: {soda_date_created}"
 
-    if date_created > datetime.datetime.now():
+    if date_created > now:
         return f"E050 Creation date mustn't be in the future: {soda_date_created}"
 
-    # endregion
-    # region Date changed
+    if epochs is not None:
+        epochs["Date created"] = date_created.timestamp()
+
+
+def _soda_date_changed_check(soda: dict, header: dict, now: datetime.datetime,
+                             epochs: [dict, None] = None) -> [None, str]:
+    """Also puts the date as epoch seconds, or None if it's empty, into epochs, if given"""
 
     soda_date_changed = soda["Date changed"]
 
+    if epochs is not None:
+        epochs["Date changed"] = None
+
     if soda_date_changed:
 
         try:
-            date_changed = datetime.datetime.strptime(soda_date_changed, date_format)
+            date_changed = datetime.datetime.strptime(soda_date_changed, header["Date format"])
 
         except ValueError:
             return f"E051 Invalid change date: {soda_date_changed}"
 
-        if date_changed > datetime.datetime.now():
+        if date_changed > now:
             return f"E052 Change date mustn't be in the future: {soda_date_changed}"
 
-    # endregion
+        if epochs is not None:
+            epochs["Date changed"] = date_changed.timestamp()
+
+
+# Field, check and the fields whose checks must have passed before it can run, in the order standalone_check runs them
+_soda_checks = (
+    ("Name", _soda_name_check, ()),
+    ("Cusoco", _soda_cusoco_check, ()),
+    ("Storage unit", _soda_storage_unit_check, ()),
+    ("Container type", _soda_container_type_check, ("Storage unit",)),
+    ("Contents", lambda soda, header, now: _soda_strings_check(soda, "Contents"), ()),
+    ("Tags", lambda soda, header, now: _soda_strings_check(soda, "Tags"), ()),
+    ("Image paths", lambda soda, header, now: _soda_strings_check(soda, "Image paths"), ()),
+    ("Numeric attributes", _soda_numeric_attributes_check, ()),
+    ("Categorical attributes", _soda_categorical_attributes_check, ()),
+    ("Image paths", _soda_image_paths_check, ("Image paths",)),
+    ("F3D folder path", _soda_f3d_folder_path_check, ()),
+    ("Location", _soda_location_check, ("Storage unit", "Container type")),
+    ("Date created", _soda_date_created_check, ()),
+    ("Date changed", _soda_date_changed_check, ()))
+
+
+def standalone_check(soda: dict, header: [dict, None] = None,
+                     now: [datetime.datetime, None] = None) -> [None, str]:
+    """Check if a soda is valid, without taking stored sodas into consideration. Dates after now are invalid"""
 
+    if header is None:
+        header = _default_store.get_header()
+
+    if now is None:
+        now = datetime.datetime.now()
+
+    structure_return = _soda_structure_check(soda)
+    if structure_return:
+        return structure_return
+
+    for _, check, _ in _soda_checks:
 
-def collective_check(soda: dict, fida: [List[dict], None] = None, header: [dict, None] = None) -> [None, str]:
+        check_return = check(soda, header, now)
+        if check_return:
+            return check_return
+
+
+def collective_check(soda: dict, fida: [List[dict], None] = None, header: [dict, None] = None,
+                     now: [datetime.datetime, None] = None) -> [None, str]:
     """Check if a soda is valid, and if it doesn't have matching values of existing sodas"""
 
     if fida is None:
-        fida = _global_fida.copy()
+        fida = _default_store.get_fida()
 
     if header is None:
-        header = _global_header.copy()
+        header = _default_store.get_header()
 
     container_types = header["Container types"]
 
-    standalone_return = standalone_check(soda, header)
+    standalone_return = standalone_check(soda, header, now)
     if standalone_return:
         return f"E053 {standalone_return}"
 
@@ -354,21 +446,140 @@ def collective_check(soda: dict, fida: [List[dict], None] = None, header: [dict,
             return f"E055 Location is overlapping #{i['Cusoco']}'s location"
 
 
+def _footprint(soda: dict, header: dict) -> List[tuple]:
+    """Returns all cells a container takes up, as tuples in the order of its storage unit's axes"""
+
+    storage_unit = soda["Storage unit"]
+    location = soda["Location"]
+    size = header["Container types"][soda["Container type"]][storage_unit]
+
+    return list(itertools.product(*[range(location[axis], location[axis] + size.get(axis, 1))
+                                    for axis in header["Storage units"][storage_unit].keys()]))
+
+
+def _problem(message: str, cusoco: [int, None] = None, index: [int, None] = None, field: [str, None] = None) -> dict:
+    return {"Code": message[:4], "Cusoco": cusoco, "Index": index, "Field": field, "Message": message[5:]}
+
+
+def _soda_problems(soda: dict, index: int, header: dict, now: datetime.datetime, seen: tuple,
+                   timestamps: [dict, None] = None):
+    """Yields the problems of one soda. seen holds the cusocos, names and taken cells of the sodas before it, and is
+    updated for the sodas after it. With timestamps, the dates parsed by the checks are kept there like in
+    Store.timestamps"""
+
+    cusocos, names, cells = seen
+    cusoco = soda.get("Cusoco") if type(soda) is dict else None
+
+    structure_return = _soda_structure_check(soda)
+    if structure_return:
+        yield _problem(structure_return, cusoco, index)
+        return
+
+    epochs = None if timestamps is None else {}
+
+    failed = set()
+    for field, check, requires in _soda_checks:
+
+        if failed.intersection(requires):
+            continue
+
+        if field in ("Date created", "Date changed"):
+            check_return = check(soda, header, now, epochs)
+        else:
+            check_return = check(soda, header, now)
+
+        if check_return:
+            failed.add(field)
+            yield _problem(check_return, cusoco, index, field)
+
+    if epochs is not None and len(epochs) == 2:
+        timestamps[cusoco] = (epochs["Date created"], epochs["Date changed"])
+
+    if cusoco in cusocos:
+        yield _problem(f"E054 Cusoco = {cusoco} already used", cusoco, index, "Cusoco")
+    cusocos.add(cusoco)
+
+    name = soda["Name"]
+    if name in names:
+        yield _problem(f"E009 Name = {name} already used by #{names[name]}", cusoco, index, "Name")
+    else:
+        names[name] = cusoco
+
+    if failed.intersection(("Storage unit", "Container type", "Location")):
+        return
+
+    occupied = cells.setdefault(soda["Storage unit"], {})
+    overlapping = []
+
+    for cell in _footprint(soda, header):
+        other = occupied.setdefault(cell, (index, cusoco))
+
+        if other[0] != index and other not in overlapping:
+            overlapping.append(other)
+
+    for _, other_cusoco in overlapping:
+        yield _problem(f"E055 Location is overlapping #{other_cusoco}'s location", cusoco, index, "Location")
+
+
+def _fida_problems(fida: List[dict], header: dict, now: datetime.datetime):
+    """Yields the problems of all sodas in one pass. Cusocos and names are looked up in dicts, and overlaps in a map
+    of the cells taken up so far, so no soda is compared with every other soda"""
+
+    seen = (set(), {}, {})
+
+    for index, soda in enumerate(fida):
+        yield from _soda_problems(soda, index, header, now, seen)
+
+
+def _fida_check_return(problem: dict) -> str:
+    check_return = f"{problem['Code']} {problem['Message']}"
+
+    if problem["Code"] not in ("E009", "E054", "E055"):
+        check_return = f"E053 {check_return}"
+
+    return f"E056 Soda #{problem['Cusoco']}: {check_return}"
+
+
 def fida_check(fida: List[dict], header: [dict, None] = None) -> [None, str]:
     """Check if fida is fully valid"""
 
-    for i in fida:
+    if header is None:
+        header = _default_store.get_header()
+
+    for problem in _fida_problems(fida, header, datetime.datetime.now()):
+        return _fida_check_return(problem)
+
+
+def validation_report(fida: List[dict], header: [dict, None] = None) -> List[dict]:
+    """Checks header and fida in one pass, listing every problem instead of stopping at the first. Each problem has
+    its error code, the cusoco, fida index and field it was found in, and the message. Sodas are only checked if the
+    header is valid"""
+
+    if header is None:
+        header = _default_store.get_header()
+
+    structure_return = _header_structure_check(header)
+    if structure_return:
+        return [_problem(structure_return)]
 
-        fida_copy = fida.copy()
-        fida_copy.remove(i)
+    problems = []
+    for field, check, requires in _header_checks:
 
-        check_return = collective_check(i, fida_copy, header)
+        if any(i["Field"] in requires for i in problems):
+            continue
+
+        check_return = check(header)
         if check_return:
-            return f"E056 Soda #{i['Cusoco']}: {check_return}"
+            problems.append(_problem(check_return, field=field))
 
+    if problems:
+        return problems
+
+    return list(_fida_problems(fida, header, datetime.datetime.now()))
 
-def _header_check(header: dict, check_all: bool = True) -> [None, str]:
-    """Checks if header is valid"""
+
+def _header_structure_check(header: dict, check_all: bool = True) -> [None, str]:
+    """Checks type, keys, value types and dates of a header. The other header checks rely on these"""
 
     modified_template_header = _template_header.copy()
     if not check_all:
@@ -413,7 +624,8 @@ def _header_check(header: dict, check_all: bool = True) -> [None, str]:
         except ValueError:
             return f"E061 Last saved invalid: {header['Last saved']}"
 
-    # In-depth storage units check
+
+def _header_storage_units_check(header: dict) -> [None, str]:
     for storage_unit, value in header["Storage units"].items():
 
         if type(value) is not dict:
@@ -439,7 +651,8 @@ def _header_check(header: dict, check_all: bool = True) -> [None, str]:
                         f"than the second value for the storage unit position limits for each axis "
                         f"({storage_unit}: {axis}: {limit_values})")
 
-    # In-depth container types check
+
+def _header_container_types_check(header: dict) -> [None, str]:
     for container_type, value in header["Container types"].items():
 
         if type(value) is not dict:
@@ -471,8 +684,11 @@ def _header_check(header: dict, check_all: bool = True) -> [None, str]:
                 if axis_size > axis_max_size:
                     return f"E073 Container too large for associated storage unit: {({axis_name: axis_size})}"
 
-    # In-depth unit conversions check
-    seen_units = list(header["Unit conversions"].keys())
+
+def _header_unit_conversions_check(header: dict) -> [None, str]:
+    """Also builds the unit registry on the way"""
+
+    registry = {base_unit: base_unit for base_unit in header["Unit conversions"].keys()}
     for base_unit, value in header["Unit conversions"].items():
 
         if not base_unit.strip():
@@ -503,10 +719,10 @@ def _header_check(header: dict, check_all: bool = True) -> [None, str]:
 
             for i, j in sub_conversion.items():
 
-                if i not in ["+", "-", "*", "/"]:
+                if i not in _conversion_operations:
                     return f"E082 Sub-unit conversion dict must only have + - * /, not {i} ({base_unit})"
 
-                if type(j) not in [int, float]:
+                if type(j) not in (int, float):
                     return f"E083 Sub-unit conversion values must be int or float, not {type(j)} ({base_unit})"
 
             operations = sub_conversion.keys()
@@ -517,12 +733,15 @@ def _header_check(header: dict, check_all: bool = True) -> [None, str]:
             if "*" in operations and "/" in operations:
                 return f"E085 Sub-unit conversion dict mustn't have both * and / in it ({base_unit})"
 
-            if sub_unit in seen_units:
+            if sub_unit in registry:
                 return f"E086 Sub-unit has already been declared as a unit ({base_unit})"
 
-            seen_units.append(sub_unit)
+            registry[sub_unit] = base_unit
 
-    # In-depth numeric attributes check
+    _remember_unit_registry(header["Unit conversions"], registry)
+
+
+def _header_numeric_attributes_check(header: dict) -> [None, str]:
     for key, value in header["Numeric attributes"].items():
 
         if type(value) is not str:
@@ -531,49 +750,152 @@ def _header_check(header: dict, check_all: bool = True) -> [None, str]:
         if value.strip() != value:
             return f"E088 Numeric attribute units mustn't contain leading or trailing spaces ({key})"
 
-        unit_check_return = unit_check(value, False, header)
-        if unit_check_return:
-            return f"E089 Invalid numeric attribute unit: {unit_check_return} ({key})"
+        if _base_unit(value, header) is None:
+            return f"E089 Invalid numeric attribute unit: E099 Invalid unit ({key})"
+
+
+# Field, check and the fields whose checks must have passed before it can run, in the order _header_check runs them
+_header_checks = (
+    ("Storage units", _header_storage_units_check, ()),
+    ("Container types", _header_container_types_check, ("Storage units",)),
+    ("Unit conversions", _header_unit_conversions_check, ()),
+    ("Numeric attributes", _header_numeric_attributes_check, ("Unit conversions",)))
+
+
+def _header_check(header: dict, check_all: bool = True) -> [None, str]:
+    """Checks if header is valid"""
+
+    structure_return = _header_structure_check(header, check_all)
+    if structure_return:
+        return structure_return
+
+    for _, check, _ in _header_checks:
+
+        check_return = check(header)
+        if check_return:
+            return check_return
 
 
 def _file_check(path: str) -> [None, str]:
-    """Checks integrity of fida and header of file"""
+    """Checks integrity of fida and header of file. Sodas are checked as they're read, so the file is never in
+    memory as a whole"""
+
+    try:
+        for _ in _checked_stream(path):
+            pass
+
+    except AutodexException as error:
+        return str(error)
+
+
+def _checked_stream(path: str, progress: [Callable[[int, int, int], None], None] = None,
+                    timestamps: [dict, None] = None):
+    """Like _read_stream, but the header is checked before it's yielded, and each soda before it's yielded. The
+    first problem is raised with the error codes of _file_check. With timestamps, the parsed dates of the sodas
+    are kept there"""
+
+    stream = _read_stream(path, progress)
+    header = next(stream)
+
+    header_check_return = _header_check(header)
+    if header_check_return:
+        raise AutodexException(f"E095 Header: {header_check_return}")
+
+    yield header
+
+    now = datetime.datetime.now()
+    seen = (set(), {}, {})
+
+    for index, soda in enumerate(stream):
+        for problem in _soda_problems(soda, index, header, now, seen, timestamps):
+            raise AutodexException(f"E096 Fida: {_fida_check_return(problem)}")
+
+        yield soda
+
+
+def scan_file(path: str = _save_path, progress: [Callable[[int, int, int], None], None] = None):
+    """Yields the sodas of a file one at a time, each once it's read and checked, without loading the file. Only
+    the cusocos, names and taken cells of earlier sodas are kept for the checks. Problems are raised like in
+    load_file. progress is called with bytes read, file size and sodas read so far"""
+
+    stream = _checked_stream(path, progress)
+    next(stream)
+
+    yield from stream
+
+
+def file_validation_report(path: str = _save_path) -> List[dict]:
+    """Like validation_report, for the header and fida of a file"""
 
     try:
-        with open(path, "r", encoding="utf-8") as file:
-            data = json.load(file)
+        data = _read_data(path)
 
-    except json.decoder.JSONDecodeError as error:
-        return f"E090 Couldn't decode file: {error}"
+    except (json.decoder.JSONDecodeError, UnicodeDecodeError, AutodexException) as error:
+        return [_problem(f"E090 Couldn't decode file: {error}")]
 
     except FileNotFoundError:
-        return f"E091 File not found"
+        return [_problem("E091 File not found")]
+
+    if type(data) is not list:
+        return [_problem("E154 File must be a list of header and fida")]
 
     if len(data) != 2:
-        return f"E092 Length of outer list in file must be 2, not {len(data)}"
+        return [_problem(f"E092 Length of outer list in file must be 2, not {len(data)}")]
 
-    header = data[0]
-    fida = data[1]
+    if type(data[0]) is not dict:
+        return [_problem(f"E093 Header must be a dict, not {type(data[0])}")]
+    if type(data[1]) is not list:
+        return [_problem(f"E094 Fida must be a list, not {type(data[1])}")]
 
-    if type(header) is not dict:
-        return f"E093 Header must be a dict, not {type(header)}"
-    if type(fida) is not list:
-        return f"E094 Fida must be a list, not {type(fida)}"
+    return validation_report(data[1], data[0])
+
+
+def _remember_unit_registry(conversions: dict, registry: dict) -> None:
+    if len(_unit_registries) >= 16:
+        _unit_registries.clear()
+
+    _unit_registries[id(conversions)] = (conversions, registry)
+
+
+def _unit_registry(conversions: dict) -> dict:
+    """Maps every unit of the unit conversions to its base unit"""
+
+    registry = {}
+    for base_unit, value in conversions.items():
+        registry.setdefault(base_unit, base_unit)
+
+        if type(value) is dict:
+            for sub_unit in value.keys():
+                registry.setdefault(sub_unit, base_unit)
+
+    _remember_unit_registry(conversions, registry)
+
+    return registry
 
-    header_check_return = _header_check(header)
-    if header_check_return:
-        return f"E095 Header: {header_check_return}"
 
-    fida_check_return = fida_check(fida, header)
-    if fida_check_return:
-        return f"E096 Fida: {fida_check_return}"
+def _base_unit(unit: str, header: dict) -> [str, None]:
+    """Returns the base unit of a unit, None if the header has no such unit. Registries are cached per unit
+    conversions dict, and every answer is checked against the unit conversions, so the registry is built again if
+    they were changed in place"""
+
+    conversions = header["Unit conversions"]
+
+    cached = _unit_registries.get(id(conversions))
+    if cached is not None and cached[0] is conversions:
+        base_unit = cached[1].get(unit)
+        value = conversions.get(base_unit)
+
+        if (base_unit == unit and base_unit in conversions) or (type(value) is dict and unit in value):
+            return base_unit
+
+    return _unit_registry(conversions).get(unit)
 
 
 def unit_check(value: str, has_numbers: bool = True, header: [dict, None] = None) -> [None, str]:
     """Checks if unit or value is valid"""
 
     if header is None:
-        header = _global_header
+        header = _default_store.header
 
     value = value.strip()
 
@@ -609,20 +931,16 @@ def unit_check(value: str, has_numbers: bool = True, header: [dict, None] = None
 
     unit = unit.strip()
 
-    seen = False
-    for key, value in header["Unit conversions"].items():
-
-        if unit == key or unit in value.keys():
-            seen = True
-            break
-
-    if not seen:
+    if _base_unit(unit, header) is None:
         return "E099 Invalid unit"
 
 
-def separate_number_and_unit(value: str) -> List[Union[float, str]]:
+def separate_number_and_unit(value: str, header: [dict, None] = None) -> List[Union[float, str]]:
     """Separates value into float and unit, raises exception if value is invalid"""
 
+    if header is None:
+        header = _default_store.header
+
     value = value.strip()
 
     if not value.startswith(("0", "1", "2", "3", "4", "5", "6", "7", "8", "9",
@@ -653,14 +971,7 @@ def separate_number_and_unit(value: str) -> List[Union[float, str]]:
 
     unit = unit.strip()
 
-    seen = False
-    for key, value in _global_header["Unit conversions"].items():
-
-        if unit == key or unit in value.keys():
-            seen = True
-            break
-
-    if not seen:
+    if _base_unit(unit, header) is None:
         raise AutodexException("E003 Invalid unit")
 
     return [number, unit]
@@ -670,50 +981,34 @@ def get_unit_conversions(unit: str, with_self: bool = False, header: [dict, None
     """Returns list of all units that the given unit can be converted to, with or without itself"""
 
     if header is None:
-        header = _global_header
+        header = _default_store.header
 
     unit = unit.strip()
 
-    for key, value in header["Unit conversions"].items():
-
-        if unit == key or unit in value.keys():
-            possible_units = list(value.keys())
-            possible_units.insert(0, key)
-
-            if not with_self:
-                possible_units.remove(unit)
+    base_unit = _base_unit(unit, header)
 
-            return possible_units
+    if base_unit is None:
+        raise AutodexException("E004 Invalid unit")
 
-    raise AutodexException("E004 Invalid unit")
+    possible_units = list(header["Unit conversions"][base_unit].keys())
+    possible_units.insert(0, base_unit)
 
+    if not with_self:
+        possible_units.remove(unit)
 
-def convert_unit(old_value: str, new_unit, with_prefix: bool = False) -> [int, str]:
-    """Converts old_value to new_unit, raises exception if values are invalid or incompatible"""
-
-    conversions = _global_header["Unit conversions"]
+    return possible_units
 
-    try:
-        old_number, old_unit = separate_number_and_unit(old_value)
-    except AutodexException:
-        raise AutodexException("E005 Invalid value")
 
-    try:
-        possible_units = get_unit_conversions(new_unit, True)
-    except AutodexException:
-        raise AutodexException("E006 New unit invalid")
+def _convert_number(number: [int, float], old_unit: str, new_unit: str, header: dict) -> [int, float]:
+    """Converts number from old_unit to new_unit, both must be in the same unit base"""
 
-    if old_unit not in possible_units:
-        raise AutodexException("E007 Old unit incompatible with new unit")
+    conversions = header["Unit conversions"]
 
     if old_unit not in conversions.keys():
-        for key, values in conversions.items():
+        base_unit = _base_unit(old_unit, header)
+        old_conversion_dict = conversions[base_unit][old_unit]
 
-            if old_unit in values.keys():
-                base_unit = key
-                old_conversion_dict = values[old_unit]
-
-        base_number = old_number
+        base_number = number
 
         if "+" in old_conversion_dict.keys():
             base_number -= old_conversion_dict["+"]
@@ -727,7 +1022,7 @@ def convert_unit(old_value: str, new_unit, with_prefix: bool = False) -> [int, s
 
     else:
         base_unit = old_unit
-        base_number = old_number
+        base_number = number
 
     new_number = base_number
 
@@ -744,318 +1039,3121 @@ def convert_unit(old_value: str, new_unit, with_prefix: bool = False) -> [int, s
         elif "-" in new_conversion_dict.keys():
             new_number -= new_conversion_dict["-"]
 
+    return new_number
+
+
+def convert_unit(old_value: str, new_unit, with_prefix: bool = False, header: [dict, None] = None) -> [int, str]:
+    """Converts old_value to new_unit, raises exception if values are invalid or incompatible"""
+
+    if header is None:
+        header = _default_store.header
+
+    try:
+        old_number, old_unit = separate_number_and_unit(old_value, header)
+    except AutodexException:
+        raise AutodexException("E005 Invalid value")
+
+    try:
+        possible_units = get_unit_conversions(new_unit, True, header)
+    except AutodexException:
+        raise AutodexException("E006 New unit invalid")
+
+    if old_unit not in possible_units:
+        raise AutodexException("E007 Old unit incompatible with new unit")
+
+    new_number = _convert_number(old_number, old_unit, new_unit, header)
+
     if with_prefix:
         new_number = str(new_number) + new_unit
 
     return new_number
 
 
-def change_numeric_attributes(
-        attribute: str,
-        operation:
-        Literal["change standard unit", "change unit bases", "rename", "merge", "add", "delete"],
-        commit: bool,
-        unit: str = None,
-        rename_to: str = None,
-        merge_into: str = None) -> [str, list, Literal[True]]:
-    """Change numeric attributes in the header. Makes changes to fida if required"""
+def _normalize_text(text: str) -> str:
+    """Lowercase text with single spaces, used for case-insensitive lookups"""
 
-    numeric_attributes = _global_header["Numeric attributes"]
+    return " ".join(text.split()).casefold()
 
-    if operation in ["change standard unit", "change unit bases", "rename", "merge", "delete"]:
 
-        if attribute not in numeric_attributes.keys():
-            return "E100 Invalid attribute"
+def _parse_date(value: str, date_format: str) -> [float, None]:
+    """Converts a date string to epoch seconds, or None if it's empty"""
 
-    if operation in ["change standard unit", "change unit bases", "add"]:
+    if not value:
+        return None
 
-        if unit_check(unit, False):
-            return "E101 Invalid unit"
+    return datetime.datetime.strptime(value, date_format).timestamp()
 
-    if operation in ["change standard unit", "change unit bases"]:
 
-        if unit == numeric_attributes[attribute]:
-            return "E102 Unit already saved"
+def _fingerprint(path: str) -> dict:
+    """Returns size, modification time and content hash of a file"""
 
-    if operation == "change standard unit":
+    digest = hashlib.sha256()
 
-        if unit not in get_unit_conversions(numeric_attributes[attribute], True):
-            return "E103 Unit is in a different unit base"
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
 
-        if commit:
-            _global_header["Numeric attributes"][attribute] = unit
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
 
-        return True
+    return {"Size": stat.st_size, "Mtime": stat.st_mtime_ns, "Hash": digest.hexdigest()}
 
-    if operation == "change unit bases":
 
-        if unit in get_unit_conversions(numeric_attributes[attribute], True):
-            return "E104 Unit is in the same unit base"
+@contextmanager
+def _locked_file(path: str, exclusive: bool):
+    """Holds an advisory lock on path + ".lock" so processes using autodex don't save over each other"""
 
-        _global_header["Numeric attributes"][attribute] = unit.strip()
+    with open(path + ".lock", "a+b") as lock_file:
 
-        changes_list = []
-        for index in range(len(_global_fida)):
-            soda = _global_fida[index]
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
 
-            if attribute in soda["Numeric attributes"].keys():
-                changes_list.append(soda["Cusoco"])
+        try:
+            yield
 
-                if commit:
-                    soda["Numeric attributes"].pop(attribute)
-                    soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
-                                                                      _global_header["Date format"])
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
 
-        return changes_list
 
-    if operation == "rename":
+def _encode_record(soda: dict) -> bytes:
+    return json.dumps(soda, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
-        if attribute == rename_to:
-            return "E105 New attribute name mustn't be the same"
 
-        if rename_to in numeric_attributes.keys():
-            return "E106 New attribute name already taken"
+def _decode_record(data: [bytes, memoryview], encoding: int) -> dict:
+    if encoding != 0:
+        raise AutodexException(f"E145 Unknown record encoding: {encoding}")
 
-        if not rename_to.strip():
-            return "E107 New attribute name mustn't be empty"
+    return json.loads(bytes(data).decode("utf-8"))
 
-        changes_list = []
-        for index in range(len(_global_fida)):
-            soda = _global_fida[index]
 
-            if attribute in soda["Numeric attributes"].keys():
-                changes_list.append(soda["Cusoco"])
+def _write_indexed_file(path: str, header: dict, fida: List[dict], source: [dict, None] = None) -> None:
+    """Writes header and fida in the indexed format: a fixed-size prefix, the content hash of the source, the header
+    as JSON, a table of (cusoco, offset, length) sorted by cusoco, and one encoded record per soda. source is the
+    fingerprint of the file it was made from, if any"""
 
-                if commit:
-                    soda["Numeric attributes"][rename_to] = soda["Numeric attributes"].pop(attribute)
-                    soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
-                                                                      _global_header["Date format"])
+    header_bytes = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    records = sorted(((soda["Cusoco"], _encode_record(soda)) for soda in fida), key=itemgetter(0))
 
-        if commit:
-            _global_header["Numeric attributes"][rename_to] = _global_header["Numeric attributes"].pop(attribute)
+    offset = _indexed_prefix.size + _indexed_hash_size + len(header_bytes) + _indexed_entry.size * len(records)
+    table = []
+    for cusoco, record in records:
+        table.append(_indexed_entry.pack(cusoco, offset, len(record)))
+        offset += len(record)
 
-        return changes_list
+    temp_path = path + ".tmp"
 
-    if operation == "merge":
+    with open(temp_path, "wb") as file:
+        file.write(_indexed_prefix.pack(_indexed_magic, 2, 0, 0,
+                                        source["Size"] if source else 0, source["Mtime"] if source else 0,
+                                        len(header_bytes), len(records)))
+        file.write(bytes.fromhex(source["Hash"]) if source else bytes(_indexed_hash_size))
+        file.write(header_bytes)
+        file.writelines(table)
+        file.writelines(record for _, record in records)
 
-        if merge_into not in numeric_attributes.keys():
-            return "E108 Invalid merge-into attribute"
+    os.replace(temp_path, path)
 
-        if merge_into == attribute:
-            return "E109 Attribute mustn't merge with itself"
 
-        if numeric_attributes[attribute] not in get_unit_conversions(numeric_attributes[merge_into], True):
-            return "E110 Attributes must have the same unit base"
+def _is_indexed_file(path: str) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(_indexed_magic)) == _indexed_magic
 
-        changes_list = []
-        for index in range(len(_global_fida)):
-            soda = _global_fida[index]
 
-            if attribute in soda["Numeric attributes"].keys():
-                changes_list.append(soda["Cusoco"])
+def _little_endian(numbers: array) -> bytes:
+    """Returns the numbers as little-endian bytes, prefixed with the typecode of the smallest integer type they fit
+    in, or with d for floats"""
 
-                if commit:
-                    if merge_into in soda["Numeric attributes"].keys():
+    if numbers.typecode == "q" and numbers:
+        low = min(numbers)
+        high = max(numbers)
 
-                        old_dict = soda["Numeric attributes"].pop(attribute)
-                        new_dict = soda["Numeric attributes"][merge_into]
-                        merged_dict = new_dict.copy()
+        for typecode in ("b", "h", "i"):
+            limit = 1 << (8 * array(typecode).itemsize - 1)
 
-                        for key, value in old_dict.items():
+            if -limit <= low and high < limit:
+                numbers = array(typecode, numbers)
+                break
 
-                            if key in new_dict.keys():
-                                merged_dict[key] = list(set(merged_dict[key]).union(value))
+    if sys.byteorder == "big":
+        numbers = array(numbers.typecode, numbers)
+        numbers.byteswap()
 
-                            else:
-                                merged_dict[key] = value
+    return numbers.typecode.encode("ascii") + numbers.tobytes()
 
-                        soda["Numeric attributes"][merge_into] = merged_dict
 
-                    else:
-                        soda["Numeric attributes"][merge_into] = soda["Numeric attributes"].pop(attribute)
+def _encode_snapshot(header: dict, fida: List[dict]) -> bytes:
+    """Encodes header and fida in the compact snapshot format. Every distinct string is stored once in a string
+    table, and the sodas are split into one array of numbers and string table indexes per field"""
 
-                    soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
-                                                                      _global_header["Date format"])
+    strings = {}
+    layouts = {}
+    streams = {name: array("q") for name in _snapshot_streams}
+    floats = array("d")
 
-        if commit:
-            _global_header["Numeric attributes"].pop(attribute)
+    def ref(text: str) -> int:
+        index = strings.get(text)
 
-        return changes_list
+        if index is None:
+            index = strings[text] = len(strings)
 
-    if operation == "add":
+        return index
 
-        if attribute in numeric_attributes.keys():
-            return "E111 Attribute exists already"
+    try:
+        for soda in fida:
+            streams["Layout"].append(layouts.setdefault(tuple(soda.keys()), len(layouts)))
+            streams["Cusoco"].append(soda["Cusoco"])
 
-        attribute = attribute.strip()
+            for key in _snapshot_string_fields:
+                streams[key].append(ref(soda[key]))
 
-        if not attribute:
-            return "E112 Attribute name mustn't be empty"
+            for key in _snapshot_list_fields:
+                streams[f"{key} count"].append(len(soda[key]))
+                streams[key].extend(ref(i) for i in soda[key])
 
-        if commit:
-            _global_header["Numeric attributes"][attribute] = unit.strip()
+            streams["Location count"].append(len(soda["Location"]))
+            for key, value in soda["Location"].items():
+                streams["Location keys"].append(ref(key))
+                streams["Location values"].append(value)
 
-        return True
+            streams["Numeric count"].append(len(soda["Numeric attributes"]))
+            for attribute, values in soda["Numeric attributes"].items():
+                streams["Numeric names"].append(ref(attribute))
+                streams["Numeric unit count"].append(len(values))
 
-    if operation == "delete":
+                for unit, numbers in values.items():
+                    streams["Numeric units"].append(ref(unit))
+                    streams["Numeric value count"].append(len(numbers))
 
-        changes_list = []
-        for index in range(len(_global_fida)):
-            soda = _global_fida[index]
+                    for number in numbers:
+                        if type(number) is int:
+                            streams["Numeric kinds"].append(0)
+                            streams["Numeric ints"].append(number)
+                        else:
+                            streams["Numeric kinds"].append(1)
+                            floats.append(number)
 
-            if attribute in soda["Numeric attributes"].keys():
-                changes_list.append(soda["Cusoco"])
+            streams["Categorical count"].append(len(soda["Categorical attributes"]))
+            for attribute, values in soda["Categorical attributes"].items():
+                streams["Categorical names"].append(ref(attribute))
+                streams["Categorical value count"].append(len(values))
+                streams["Categorical values"].extend(ref(i) for i in values)
 
-                if commit:
-                    soda["Numeric attributes"].pop(attribute)
+    except (KeyError, TypeError, AttributeError, OverflowError) as error:
+        raise AutodexException(f"E147 Fida can't be encoded as snapshot: {type(error).__name__}: {error}")
 
-                    soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
-                                                                      _global_header["Date format"])
+    table = list(strings.keys())
 
-        if commit:
-            _global_header["Numeric attributes"].pop(attribute)
+    sections = [json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+                json.dumps([list(i) for i in layouts.keys()], ensure_ascii=False).encode("utf-8"),
+                _little_endian(array("q", map(len, table))),
+                "".join(table).encode("utf-8", "surrogatepass"),
+                _little_endian(floats)]
+    sections += [_little_endian(streams[name]) for name in _snapshot_streams]
 
-        return changes_list
+    return b"".join([_snapshot_prefix.pack(_snapshot_magic, 1, 0, len(sections))]
+                    + [struct.pack("<Q", len(i)) + i for i in sections])
 
-    raise AutodexException(f"E008 Invalid operation: {operation}")
 
+def _decode_snapshot(data: bytes) -> list:
+    """Decodes a snapshot into [header, fida]"""
 
-def add_soda(soda: dict, commit: bool) -> [str, list]:
-    """Creates a new soda in global_fida"""
+    try:
+        magic, version, _, count = _snapshot_prefix.unpack_from(data, 0)
 
-    soda = soda.copy()
+        if magic != _snapshot_magic or version != 1 or count != 5 + len(_snapshot_streams):
+            raise AutodexException("E148 Invalid snapshot prefix")
 
-    if "Date created" in soda.keys() or "Date changed" in soda.keys():
-        return "E113 Soda mustn't contain Date created or Date changed"
+        sections = []
+        position = _snapshot_prefix.size
+        for _ in range(count):
+            length = struct.unpack_from("<Q", data, position)[0]
+            position += 8
+            sections.append(data[position:position + length])
+            position += length
 
-    soda["Date created"] = datetime.datetime.strftime(datetime.datetime.now(), _global_header["Date format"])
-    soda["Date changed"] = ""
+        def numbers(section: bytes) -> list:
+            result = array(section[:1].decode("ascii"))
+            result.frombytes(section[1:])
 
-    check_return = collective_check(soda)
+            if sys.byteorder == "big":
+                result.byteswap()
 
-    if check_return:
-        return f"E114 {check_return}"
+            return result.tolist()
 
-    if commit:
-        _global_fida.append(soda)
+        header = json.loads(sections[0].decode("utf-8"))
+        layouts = [tuple(i) for i in json.loads(sections[1].decode("utf-8"))]
 
-    return [soda["Cusoco"]]
+        text = sections[3].decode("utf-8", "surrogatepass")
+        offsets = list(itertools.accumulate(numbers(sections[2]), initial=0))
+        table = list(map(text.__getitem__, map(slice, offsets, offsets[1:])))
 
+        floats = iter(numbers(sections[4]))
+        streams = {name: numbers(section) for name, section in zip(_snapshot_streams, sections[5:])}
 
-def delete_soda(cusoco: int, commit: bool) -> [str, list]:
-    """Deletes a soda in global_fida"""
+    except (struct.error, ValueError, UnicodeDecodeError, IndexError, TypeError) as error:
+        raise AutodexException(f"E148 Couldn't decode snapshot: {type(error).__name__}: {error}")
 
-    seen = False
-    for soda in _global_fida:
+    for name in _snapshot_string_fields + _snapshot_list_fields + ("Location keys", "Numeric names", "Numeric units",
+                                                                  "Categorical names", "Categorical values"):
+        streams[name] = list(map(table.__getitem__, streams[name]))
 
-        if soda["Cusoco"] == cusoco:
-            seen = True
-            break
+    def split(items: list, counts_name: str) -> list:
+        """Splits items into consecutive lists with the lengths in a count stream"""
 
-    if not seen:
-        return "E115 Invalid cusoco"
+        ends = list(itertools.accumulate(streams[counts_name], initial=0))
 
-    if commit:
-        for index in range(len(_global_fida)):
-            soda = _global_fida[index]
+        return list(map(items.__getitem__, map(slice, ends, ends[1:])))
 
-            if soda["Cusoco"] == cusoco:
-                _global_fida.pop(index)
-                break
+    # Each level of nesting is built for all sodas at once, from the innermost lists outwards
+    ints = iter(streams["Numeric ints"])
+    numbers = [next(floats) if kind else next(ints) for kind in streams["Numeric kinds"]]
+    unit_values = split(numbers, "Numeric value count")
+    attribute_values = [dict(zip(units, values)) for units, values in
+                        zip(split(streams["Numeric units"], "Numeric unit count"),
+                            split(unit_values, "Numeric unit count"))]
+    numeric = [dict(zip(names, values)) for names, values in
+               zip(split(streams["Numeric names"], "Numeric count"), split(attribute_values, "Numeric count"))]
 
-    return [cusoco]
+    categorical = [dict(zip(names, values)) for names, values in
+                   zip(split(streams["Categorical names"], "Categorical count"),
+                       split(split(streams["Categorical values"], "Categorical value count"), "Categorical count"))]
 
+    locations = [dict(zip(keys, values)) for keys, values in
+                 zip(split(streams["Location keys"], "Location count"),
+                     split(streams["Location values"], "Location count"))]
 
-def change_soda(cusoco: int, changed_soda: dict, commit: bool) -> [str, list]:
-    """Changes a soda in global_fida"""
+    template_layout = tuple(_template_soda.keys())
 
-    global _global_fida
+    fida = []
+    for (layout, cusoco, storage_unit, container_type, location, name, description, contents, tags,
+         numeric_attributes, categorical_attributes, image_paths, f3d_folder_path, date_created,
+         date_changed) in zip(streams["Layout"], streams["Cusoco"], streams["Storage unit"], streams["Container type"],
+                              locations, streams["Name"], streams["Description"],
+                              split(streams["Contents"], "Contents count"), split(streams["Tags"], "Tags count"),
+                              numeric, categorical, split(streams["Image paths"], "Image paths count"),
+                              streams["F3D folder path"], streams["Date created"], streams["Date changed"]):
 
-    if "Date created" in changed_soda.keys() or "Date changed" in changed_soda.keys():
-        return "E116 Soda mustn't contain Date created or Date changed"
+        soda = {"Cusoco": cusoco, "Storage unit": storage_unit, "Container type": container_type,
+                "Location": location, "Name": name, "Description": description, "Contents": contents, "Tags": tags,
+                "Numeric attributes": numeric_attributes, "Categorical attributes": categorical_attributes,
+                "Image paths": image_paths, "F3D folder path": f3d_folder_path, "Date created": date_created,
+                "Date changed": date_changed}
 
-    test_fida = _global_fida.copy()
+        if layouts[layout] != template_layout:
+            soda = {key: soda[key] for key in layouts[layout]}
 
-    for index in range(len(test_fida)):
-        soda = test_fida[index]
+        fida.append(soda)
 
-        if soda["Cusoco"] == cusoco:
-            test_fida.pop(index)
+    return [header, fida]
 
-            new_soda = soda.copy()
-            new_soda.update(changed_soda)
-            new_soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
-                                                                  _global_header["Date format"])
 
-            check_return = collective_check(new_soda, test_fida)
-            if check_return:
-                return f"E117 check_return"
+def _is_snapshot_file(path: str) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(_snapshot_magic)) == _snapshot_magic
 
-            if commit:
-                test_fida.append(new_soda)
 
-                _global_fida = test_fida.copy()
+@contextmanager
+def _gc_paused():
+    """Pauses garbage collection while decoding and building indexes, which only create acyclic objects. Otherwise
+    collections keep being triggered by the many new dicts and lists, and each of them walks the whole growing fida"""
 
-            return [cusoco]
+    enabled = gc.isenabled()
+    gc.disable()
 
-    return "E118 Invalid cusoco"
+    try:
+        yield
 
+    finally:
+        if enabled:
+            gc.enable()
 
-def get_fida() -> List[dict]:
-    """Copies global_fida. Use this instead of global_fida.copy() to avoid working with global_fida directly"""
 
-    return _global_fida.copy()
+def _read_data(path: str) -> list:
+    """Reads [header, fida] from a JSON or snapshot file"""
 
+    with open(path, "rb") as file:
+        data = file.read()
 
-def save_file(path: str = _save_path, fida: [list, None] = None, header: [dict, None] = None) -> [None, str]:
-    """Saves global_fida and global_header to the file at the path"""
+    with _gc_paused():
+        if data.startswith(_snapshot_magic):
+            return _decode_snapshot(data)
 
-    if fida is None:
-        fida = _global_fida.copy()
+        return json.loads(data.decode("utf-8"))
 
-    if header is None:
-        header = _global_header.copy()
 
-    fida_check_return = fida_check(fida)
-    if fida_check_return:
-        raise AutodexException(f"E010 Fida: {fida_check_return}")
+class _JsonReader:
+    """Decodes JSON values one at a time from a file read in chunks. Only the undecoded rest of the chunks read so
+    far is kept"""
+
+    def __init__(self, file, progress: [Callable[[int, int, int], None], None] = None, chunk_size: int = 1 << 20):
+        self.file = file
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.size = os.fstat(file.fileno()).st_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.offset = 0
+        self.bytes_read = 0
+        self.values = 0
+        self.ended = False
+
+    def _fill(self, size: int = 0) -> bool:
+        """Appends the next chunk to the buffer, dropping what was decoded already. Returns False at the end of the
+        file"""
+
+        chunk = self.file.read(max(size, self.chunk_size))
+        self.bytes_read += len(chunk)
+        self.ended = not chunk
+
+        self.offset += self.position
+        self.buffer = self.buffer[self.position:] + self.decoder.decode(chunk, not chunk)
+        self.position = 0
+
+        if self.progress is not None:
+            self.progress(self.bytes_read, self.size, self.values)
+
+        return bool(chunk)
+
+    def error(self, message: str, position: [int, None] = None) -> AutodexException:
+        if position is None:
+            position = self.position
+
+        return AutodexException(f"E090 Couldn't decode file: {message} at character {self.offset + position}")
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or "" at the end of the file"""
+
+        while True:
+            self.position = _json_whitespace.match(self.buffer, self.position).end()
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if not self._fill():
+                return ""
+
+    def take(self) -> str:
+        character = self.peek()
+        self.position += 1
+
+        return character
+
+    def value(self):
+        """Decodes the next value. A value that ends with the buffer might go on in the next chunk, like a number,
+        so it's decoded again with more of the file. Each retry reads at least as much as is buffered, so values
+        longer than a chunk aren't decoded again for every chunk"""
+
+        self.peek()
+
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buffer, self.position)
+
+            except json.decoder.JSONDecodeError as error:
+                # Only errors at the end of the buffer can come from a value cut off by the chunk: an unterminated
+                # string, or a literal, number or escape reported at its start
+                cut_off = error.pos >= len(self.buffer) - 16 or error.msg.startswith("Unterminated string")
+
+                if self.ended or not cut_off:
+                    raise self.error(error.msg, error.pos)
+
+                self._fill(len(self.buffer) - self.position)
+                continue
+
+            if end == len(self.buffer) and not self.ended:
+                self._fill(len(self.buffer) - self.position)
+                continue
+
+            self.position = end
+
+            return value
+
+
+def _read_stream(path: str, progress: [Callable[[int, int, int], None], None] = None):
+    """Yields the header of a file and then its sodas, decoding JSON files one soda at a time as they're read.
+    Snapshot files are columnar and decoded at once. progress is called with bytes read, file size and sodas read
+    so far after each chunk"""
+
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        raise AutodexException("E091 File not found")
+
+    with file:
+        if file.read(len(_snapshot_magic)) == _snapshot_magic:
+            file.seek(0)
+            data = file.read()
+
+            try:
+                with _gc_paused():
+                    header, fida = _decode_snapshot(data)
+
+            except AutodexException as error:
+                raise AutodexException(f"E090 Couldn't decode file: {error}")
+
+            if progress is not None:
+                progress(len(data), len(data), len(fida))
+
+            yield header
+            yield from fida
+
+            return
+
+        file.seek(0)
+        reader = _JsonReader(file, progress)
+
+        try:
+            if reader.peek() == "":
+                raise reader.error("Expecting value")
+
+            if reader.take() != "[":
+                raise AutodexException("E154 File must be a list of header and fida")
+
+            if reader.peek() == "]":
+                raise AutodexException("E092 Length of outer list in file must be 2, not 0")
+
+            header = reader.value()
+            if type(header) is not dict:
+                raise AutodexException(f"E093 Header must be a dict, not {type(header)}")
+
+            yield header
+
+            separator = reader.take()
+            if separator == "]":
+                raise AutodexException("E092 Length of outer list in file must be 2, not 1")
+            if separator != ",":
+                raise reader.error("Expecting ',' delimiter", reader.position - 1)
+
+            if reader.peek() != "[":
+                raise AutodexException(f"E094 Fida must be a list, not {type(reader.value())}")
+            reader.take()
+
+            if reader.peek() == "]":
+                reader.take()
+
+            else:
+                keys = {}
+
+                while True:
+                    soda = reader.value()
+                    reader.values += 1
+
+                    # json.loads shares equal keys across the document, raw_decode only within one soda
+                    if type(soda) is dict:
+                        soda = {keys.setdefault(key, key): value for key, value in soda.items()}
+
+                    yield soda
+
+                    separator = reader.take()
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise reader.error("Expecting ',' delimiter", reader.position - 1)
+
+            separator = reader.take()
+            if separator == ",":
+                raise AutodexException("E092 Length of outer list in file must be 2, not more")
+            if separator != "]":
+                raise reader.error("Expecting ',' delimiter", reader.position - 1)
+
+            if reader.peek() != "":
+                raise reader.error("Extra data")
+
+        except UnicodeDecodeError as error:
+            raise AutodexException(f"E090 Couldn't decode file: {error}")
+
+        if progress is not None:
+            progress(reader.bytes_read, reader.size, reader.values)
+
+
+def _warm_key(fingerprint: dict) -> bytes:
+    return _warm_prefix.pack(_warm_magic, _warm_version, sys.version_info[0], sys.version_info[1],
+                             fingerprint["Size"], fingerprint["Mtime"], bytes.fromhex(fingerprint["Hash"]))
+
+
+def _write_warm_cache(path: str, fingerprint: dict, state: dict) -> None:
+    """Writes the state of a store, keyed by the fingerprint of the file it was loaded from. marshal only stores
+    builtin types and can't run code when loading, unlike pickle"""
+
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    with open(temp_path, "wb") as file:
+        file.write(_warm_key(fingerprint))
+        marshal.dump(state, file)
+
+    os.replace(temp_path, path)
+
+
+def _read_warm_cache(path: str, fingerprint: dict) -> [dict, None]:
+    """Returns the state written by _write_warm_cache, or None if there's none for this fingerprint, autodex
+    version and Python version"""
+
+    key = _warm_key(fingerprint)
+
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(key)) != key:
+                return None
+
+            data = file.read()
+
+    except OSError:
+        return None
+
+    try:
+        with _gc_paused():
+            state = marshal.loads(data)
+
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    return state if type(state) is dict else None
+
+
+class _ReadWriteLock:
+    """Lock that lets many readers or a single writer in at once. Waiting writers block new readers"""
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        """Blocks until no writer holds or waits for the lock. Re-entrant, also inside the owning writer"""
+
+        stack = self._local.__dict__.setdefault("read_stack", [])
+
+        with self._condition:
+            if self._writer == threading.get_ident():
+                stack.append(False)
+                return
+
+            if not stack:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+
+            self._readers += 1
+            stack.append(True)
+
+    def release_read(self) -> None:
+        stack = self._local.__dict__.setdefault("read_stack", [])
+
+        if not stack:
+            raise AutodexException("E120 Read lock released without being acquired")
+
+        counted = stack.pop()
+
+        if counted:
+            with self._condition:
+                self._readers -= 1
+
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        """Blocks until all readers and other writers are gone. Re-entrant for the owning thread"""
+
+        me = threading.get_ident()
+
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+
+            if True in self._local.__dict__.get("read_stack", []):
+                raise AutodexException("E121 Write lock can't be acquired while holding a read lock")
+
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        with self._condition:
+            if self._writer != threading.get_ident():
+                raise AutodexException("E122 Write lock released by a thread that doesn't hold it")
+
+            self._writer_depth -= 1
+
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class PreparedOperation:
+    """An add, delete or change that was validated against a store at one version, see Store.commit_prepared"""
+
+    def __init__(self, store, operation: Literal["add", "delete", "change"], arguments: tuple, cusoco: int,
+                 soda: [dict, None], target: [dict, None] = None):
+        self.store = store
+        self.operation = operation
+        self.arguments = arguments
+        self.cusoco = cusoco
+        self.soda = soda
+        self.target = target
+        self.version = store.version
+
+    def __repr__(self) -> str:
+        """Shows the operation with the cusocos it touches, like the list the unprepared operations return"""
+
+        return f"<PreparedOperation {self.operation} [{self.cusoco}]>"
+
+
+class Query:
+    """Sodas of a store matching all of a list of (field, comparison, value) conditions, for example
+
+    store.query([("Storage unit", "=", "Big rack"), ("Tags", "=", "Pneumatic"), ("Voltage DC", "<=", "24 V"),
+                 ("Name", "contains", "valve")], sort="Max pressure", descending=True, limit=10)
+
+    Fields are soda keys, numeric attributes, or else categorical attributes. Comparisons are = < <= > >= and
+    contains, which ignores case. For lists like Tags, = means the list has the value. Numeric values can have units
+    and are compared in the attribute's standard unit, matching if any value of a soda does. Sorting is by Cusoco,
+    Name, Date created, Date changed or a numeric attribute, sodas without a value come last. Without sort, sodas
+    come in no particular order.
+
+    Iterating yields copies of the matching sodas lazily. The cheapest plan is picked from the indexes when
+    iteration starts, explain() shows it"""
+
+    def __init__(self, store, conditions: List[tuple], sort: [str, None] = None, descending: bool = False,
+                 limit: [int, None] = None, offset: int = 0):
+        if offset < 0 or (limit is not None and limit < 0):
+            raise AutodexException("E153 Query limit and offset mustn't be negative")
+
+        self.store = store
+        self.conditions = conditions
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.offset = offset
+
+    def __iter__(self):
+        return self.store._run_query(self.conditions, self.sort, self.descending, self.limit, self.offset)
+
+    def get_cusocos(self) -> List[int]:
+        return [soda["Cusoco"] for soda in self]
+
+    def explain(self) -> dict:
+        """Returns the chosen plan with its estimated costs, the conditions checked on each candidate, and the plans
+        that weren't chosen"""
+
+        return self.store._explain_query(self.conditions, self.sort, self.descending, self.limit, self.offset)
+
+
+class Store:
+    """Header and fida of one file behind a reader-writer lock. The module-level functions use a default store,
+    create more stores to work with several files in one process"""
+
+    def __init__(self, path: str = _save_path, warm_start: bool = True):
+        self.path = path
+        self.warm_start = warm_start
+        self.header = {}
+        self._sodas = {}
+        self._fida = []
+        self.fingerprint = None
+        self.lock = _ReadWriteLock()
+
+        self.timestamps = {}
+        self._created_index = []
+        self._touched_index = []
+
+        self.version = 0
+        self._soda_versions = {}
+        self._deleted = {}
+        self._header_version = 0
+        self._header_changed = 0.0
+
+        self._cells = {}
+        self._layer_counts = {}
+        self._footprints = {}
+
+        self._completions = []
+        self._completion_keys = {}
+
+        self._numeric = {}
+        self._numeric_keys = {}
+
+        self._stats = self._count_stats([])
+        self._stats_keys = {}
+
+        self._cusocos_by_name = {}
+        self._name_keys = {}
+
+        self._postings = {}
+        self._posting_keys = {}
+
+    @property
+    def fida(self) -> List[dict]:
+        """Sodas in order. They're kept in a dict by cusoco, so single sodas are found, changed and deleted without
+        searching or shifting a list. The list is only rebuilt when it's needed after a change"""
+
+        if self._fida is None:
+            self._fida = list(self._sodas.values())
+
+        return self._fida
+
+    @fida.setter
+    def fida(self, fida: List[dict]) -> None:
+        self._sodas = {soda["Cusoco"]: soda for soda in fida}
+        self._fida = fida
+
+    # region Indexes
+    # Every index keeps what it indexed per cusoco, so removing a soda doesn't depend on the soda being unchanged.
+    # All index methods must be called while holding the write lock.
+
+    def _index_add(self, soda: dict) -> None:
+        cusoco = soda["Cusoco"]
+
+        self._recency_add(soda)
+        self._locations_add(soda)
+        self._completions_add(soda)
+        self._numeric_add(soda)
+        self._stats_add(soda)
+        self._names_add(soda)
+        self._postings_add(soda)
+        self._versions_add(cusoco)
+
+    def _index_remove(self, soda: dict) -> None:
+        cusoco = soda["Cusoco"]
+
+        self._recency_remove(cusoco)
+        self._locations_remove(cusoco)
+        self._completions_remove(cusoco)
+        self._numeric_remove(cusoco)
+        self._stats_remove(cusoco)
+        self._names_remove(cusoco)
+        self._postings_remove(cusoco)
+        self._versions_remove(cusoco)
+
+    def _index_rebuild(self, timestamps: [dict, None] = None) -> None:
+        self._recency_rebuild(timestamps)
+        self._locations_rebuild()
+        self._completions_rebuild()
+        self._numeric_rebuild()
+        self._stats_rebuild()
+        self._names_rebuild()
+        self._postings_rebuild()
+
+    def _versions_add(self, cusoco: int) -> None:
+        self.version += 1
+        self._soda_versions[cusoco] = self.version
+        self._deleted.pop(cusoco, None)
+
+    def _versions_remove(self, cusoco: int) -> None:
+        self.version += 1
+        self._soda_versions.pop(cusoco, None)
+        self._deleted[cusoco] = (self.version, time.time())
+
+    def _reset_versions(self) -> None:
+        """Marks the whole fida and header as changed now, used when a file was loaded"""
+
+        self.version += 1
+        self._soda_versions = {soda["Cusoco"]: self.version for soda in self.fida}
+        self._deleted = {}
+        self._header_changed_now()
+
+        last_saved = self.header.get("Last saved")
+        if last_saved:
+            self._header_changed = _parse_date(last_saved, self.header["Date format"])
+
+    def _warm_state(self) -> dict:
+        """Returns header, fida and indexes as builtin types only"""
+
+        state = {name: getattr(self, name) for name in _warm_indexes}
+        state["Header"] = self.header
+        state["Fida"] = self.fida
+        state["_stats"] = {name: dict(counter) for name, counter in self._stats.items()}
+
+        return state
+
+    def _restore_warm_state(self, state: dict) -> None:
+        self.header = state["Header"]
+        self.fida = state["Fida"]
+
+        for name in _warm_indexes:
+            setattr(self, name, state[name])
+
+        self._stats = {name: collections.Counter(counter) for name, counter in state["_stats"].items()}
+
+    def _header_changed_now(self) -> None:
+        self.version += 1
+        self._header_version = self.version
+        self._header_changed = time.time()
+
+    def _index_refresh(self, cusocos: list) -> None:
+        """Re-indexes sodas that were changed in place"""
+
+        for cusoco in set(cusocos):
+            soda = self._sodas[cusoco]
+
+            self._index_remove(soda)
+            self._index_add(soda)
+
+    # endregion
+    # region Primary keys
+
+    def _names_add(self, soda: dict) -> None:
+        self._cusocos_by_name[soda["Name"]] = soda["Cusoco"]
+        self._name_keys[soda["Cusoco"]] = soda["Name"]
+
+    def _names_remove(self, cusoco: int) -> None:
+        self._cusocos_by_name.pop(self._name_keys.pop(cusoco), None)
+
+    def _names_rebuild(self) -> None:
+        self._cusocos_by_name = {}
+        self._name_keys = {}
+
+        for soda in self.fida:
+            self._names_add(soda)
+
+    def _collective_check(self, soda: dict, now: [datetime.datetime, None] = None,
+                          replaced: [int, None] = None) -> [None, str]:
+        """Like collective_check against fida, looking up cusoco, name and cells in the indexes instead of comparing
+        every soda. The soda with the replaced cusoco is left out"""
+
+        standalone_return = standalone_check(soda, self.header, now)
+        if standalone_return:
+            return f"E053 {standalone_return}"
+
+        cusoco = soda["Cusoco"]
+        if cusoco != replaced and cusoco in self._sodas:
+            return f"E054 Cusoco = {cusoco} already used"
+
+        other = self._cusocos_by_name.get(soda["Name"])
+        if other is not None and other != replaced:
+            return f"E009 Name = {soda['Name']} already used by #{other}"
+
+        unit_cells = self._cells[soda["Storage unit"]]
+        for cell in _footprint(soda, self.header):
+
+            other = unit_cells.get(cell)
+            if other is not None and other != replaced:
+                return f"E055 Location is overlapping #{other}'s location"
+
+    def _replacement_check(self, sodas: List[dict], replaced: set, header: dict,
+                           now: datetime.datetime) -> [None, str]:
+        """Like collective_check for each of the sodas against the fida they'd be in, with the sodas of the replaced
+        cusocos taken out. Names and cells are looked up in the indexes and among the sodas, so this takes the same
+        time for any fida size. The header mustn't have different storage units or container types"""
+
+        names = {}
+        cells = {}
+
+        for soda in sodas:
+            cusoco = soda["Cusoco"]
+
+            standalone_return = standalone_check(soda, header, now)
+            if standalone_return:
+                return f"E056 Soda #{cusoco}: E053 {standalone_return}"
+
+            if cusoco in self._sodas and cusoco not in replaced:
+                return f"E056 Soda #{cusoco}: E054 Cusoco = {cusoco} already used"
+
+            name = soda["Name"]
+            other = names.get(name)
+            if other is None and self._cusocos_by_name.get(name) not in replaced:
+                other = self._cusocos_by_name.get(name)
+
+            if other is not None:
+                return f"E056 Soda #{cusoco}: E009 Name = {name} already used by #{other}"
+
+            storage_unit = soda["Storage unit"]
+            unit_cells = self._cells.get(storage_unit, {})
+            footprint = [(storage_unit, cell) for cell in _footprint(soda, header)]
+
+            for key in footprint:
+
+                other = cells.get(key)
+                if other is None and unit_cells.get(key[1]) not in replaced:
+                    other = unit_cells.get(key[1])
+
+                if other is not None:
+                    return f"E056 Soda #{cusoco}: E055 Location is overlapping #{other}'s location"
+
+            names[name] = cusoco
+            cells.update((key, cusoco) for key in footprint)
+
+    def get_soda(self, cusoco: int) -> [dict, None]:
+        """Copies the soda with the cusoco, None if there's none"""
+
+        with self.lock.read():
+            soda = self._sodas.get(cusoco)
+
+            return None if soda is None else copy.deepcopy(soda)
+
+    def get_cusoco_by_name(self, name: str) -> [int, None]:
+        """Returns the cusoco of the soda with the name, None if there's none"""
+
+        with self.lock.read():
+            return self._cusocos_by_name.get(name)
+
+    # endregion
+    # region Recency
+
+    def _recency_add(self, soda: dict) -> None:
+        cusoco = soda["Cusoco"]
+        date_format = self.header["Date format"]
+
+        created = _parse_date(soda["Date created"], date_format)
+        changed = _parse_date(soda["Date changed"], date_format)
+        touched = created if changed is None else changed
+
+        self.timestamps[cusoco] = (created, changed)
+        insort(self._created_index, (created, cusoco))
+        insort(self._touched_index, (touched, cusoco))
+
+    def _recency_remove(self, cusoco: int) -> None:
+        created, changed = self.timestamps.pop(cusoco)
+        touched = created if changed is None else changed
+
+        self._created_index.pop(bisect_left(self._created_index, (created, cusoco)))
+        self._touched_index.pop(bisect_left(self._touched_index, (touched, cusoco)))
+
+    def _recency_rebuild(self, timestamps: [dict, None] = None) -> None:
+        """Uses timestamps if the checks already parsed the dates while loading"""
+
+        date_format = self.header["Date format"]
+
+        if timestamps is not None:
+            self.timestamps = timestamps
+
+        else:
+            self.timestamps = {}
+            for soda in self.fida:
+                self.timestamps[soda["Cusoco"]] = (_parse_date(soda["Date created"], date_format),
+                                                   _parse_date(soda["Date changed"], date_format))
+
+        self._created_index = sorted((created, cusoco) for cusoco, (created, _) in self.timestamps.items())
+        self._touched_index = sorted((created if changed is None else changed, cusoco)
+                                     for cusoco, (created, changed) in self.timestamps.items())
+
+    def _to_epoch(self, value: [datetime.datetime, str, float, int, None], default: float) -> float:
+        if value is None:
+            return default
+
+        if type(value) is str:
+            return datetime.datetime.strptime(value, self.header["Date format"]).timestamp()
+
+        if type(value) is datetime.datetime:
+            return value.timestamp()
+
+        return value
+
+    def _between(self, index: list, start, end) -> List[int]:
+        start = self._to_epoch(start, float("-inf"))
+        end = self._to_epoch(end, float("inf"))
+
+        return [cusoco for _, cusoco in index[bisect_left(index, (start,)):bisect_right(index, (end, float("inf")))]]
+
+    def get_timestamps(self, cusoco: int) -> [tuple, None]:
+        """Returns creation and change date of a soda as epoch seconds. The change date is None if never changed"""
+
+        with self.lock.read():
+            return self.timestamps.get(cusoco)
+
+    def get_created_between(self, start=None, end=None) -> List[int]:
+        """Returns cusocos of sodas created between start and end, oldest first. Both can be datetimes, date
+        strings in the header's format, epoch seconds, or None for no limit"""
+
+        with self.lock.read():
+            return self._between(self._created_index, start, end)
+
+    def get_changed_between(self, start=None, end=None) -> List[int]:
+        """Returns cusocos of sodas last touched between start and end, oldest first. Touched means changed, or
+        created if never changed"""
+
+        with self.lock.read():
+            return self._between(self._touched_index, start, end)
+
+    def get_recently_touched(self, count: int = 10) -> List[int]:
+        """Returns cusocos of the most recently changed or created sodas, newest first"""
+
+        with self.lock.read():
+            return [cusoco for _, cusoco in reversed(self._touched_index[max(0, len(self._touched_index) - count):])]
+
+    # endregion
+    # region Locations
+
+    def _grid_offset(self, storage_unit: str, cell: tuple) -> int:
+        offset = 0
+        for (low, high), value in zip(self.header["Storage units"][storage_unit].values(), cell):
+            offset = offset * (high - low + 1) + value - low
+
+        return offset
+
+    def _volume(self, storage_unit: str) -> int:
+        volume = 1
+        for low, high in self.header["Storage units"][storage_unit].values():
+            volume *= high - low + 1
+
+        return volume
+
+    def _locations_add(self, soda: dict) -> None:
+        cusoco = soda["Cusoco"]
+        storage_unit = soda["Storage unit"]
+        cells = _footprint(soda, self.header)
+
+        unit_cells = self._cells[storage_unit]
+        layers = self._layer_counts[storage_unit]
+
+        for cell in cells:
+            unit_cells[cell] = cusoco
+            layers[cell[0]] = layers.get(cell[0], 0) + 1
+
+        self._footprints[cusoco] = (storage_unit, cells)
+
+    def _locations_remove(self, cusoco: int) -> None:
+        storage_unit, cells = self._footprints.pop(cusoco)
+
+        unit_cells = self._cells[storage_unit]
+        layers = self._layer_counts[storage_unit]
+
+        for cell in cells:
+            if unit_cells.get(cell) == cusoco:
+                del unit_cells[cell]
+                layers[cell[0]] -= 1
+
+    def _locations_rebuild(self) -> None:
+        self._cells = {}
+        self._layer_counts = {}
+        self._footprints = {}
+
+        for storage_unit in self.header["Storage units"].keys():
+            self._cells[storage_unit] = {}
+            self._layer_counts[storage_unit] = {}
+
+        for soda in self.fida:
+            self._locations_add(soda)
+
+    def get_at(self, storage_unit: str, location: dict) -> [int, None]:
+        """Returns the cusoco of the container taking up a location, or None if it's free"""
+
+        with self.lock.read():
+            if storage_unit not in self._cells:
+                raise AutodexException(f"E141 Invalid storage unit: {storage_unit}")
+
+            cell = tuple(location[axis] for axis in self.header["Storage units"][storage_unit].keys())
+
+            return self._cells[storage_unit].get(cell)
+
+    def get_in_region(self, storage_unit: str, region: dict) -> List[int]:
+        """Returns cusocos of containers taking up any cell in a region. The region has [low, high] per axis,
+        missing axes mean the whole axis"""
+
+        with self.lock.read():
+            if storage_unit not in self._cells:
+                raise AutodexException(f"E141 Invalid storage unit: {storage_unit}")
+
+            limits = self.header["Storage units"][storage_unit]
+            unit_cells = self._cells[storage_unit]
+
+            ranges = []
+            volume = 1
+            for axis, (low, high) in limits.items():
+                region_low, region_high = region.get(axis, (low, high))
+                ranges.append((max(low, region_low), min(high, region_high)))
+                volume *= max(0, ranges[-1][1] - ranges[-1][0] + 1)
+
+            found = set()
+
+            if volume <= len(unit_cells):
+                for cell in itertools.product(*[range(low, high + 1) for low, high in ranges]):
+                    cusoco = unit_cells.get(cell)
+
+                    if cusoco is not None:
+                        found.add(cusoco)
+
+            else:
+                for cell, cusoco in unit_cells.items():
+                    if all(low <= value <= high for value, (low, high) in zip(cell, ranges)):
+                        found.add(cusoco)
+
+            return sorted(found)
+
+    def get_occupancy(self, storage_unit: str) -> dict:
+        """Returns the occupancy grid of a storage unit, a flat array of cusocos (0 if free) in the order of the
+        axes, and the percentage of cells taken up in total and for each value of the first axis. The grid is built
+        from the taken cells when it's asked for, so only those are kept"""
+
+        with self.lock.read():
+            if storage_unit not in self._cells:
+                raise AutodexException(f"E141 Invalid storage unit: {storage_unit}")
+
+            limits = self.header["Storage units"][storage_unit]
+            unit_cells = self._cells[storage_unit]
+            layers = self._layer_counts[storage_unit]
+            volume = self._volume(storage_unit)
+
+            grid = array("q", bytes(8 * volume))
+            for cell, cusoco in unit_cells.items():
+                grid[self._grid_offset(storage_unit, cell)] = cusoco
+
+            first_axis, (low, high) = next(iter(limits.items()))
+            layer_volume = volume // (high - low + 1)
+
+            return {"Axes": list(limits.keys()),
+                    "Shape": [high - low + 1 for low, high in limits.values()],
+                    "Grid": grid,
+                    "Utilization": len(unit_cells) / volume * 100,
+                    f"Utilization by {first_axis}": {value: layers.get(value, 0) / layer_volume * 100
+                                                     for value in range(low, high + 1)}}
+
+    # endregion
+    # region Autocomplete
+
+    @staticmethod
+    def _completion_entries(soda: dict) -> List[tuple]:
+        cusoco = soda["Cusoco"]
+
+        return [(_normalize_text(text), text, cusoco) for text in [soda["Name"]] + soda["Contents"]]
+
+    def _completions_add(self, soda: dict) -> None:
+        entries = self._completion_entries(soda)
+
+        for entry in entries:
+            insort(self._completions, entry)
+
+        self._completion_keys[soda["Cusoco"]] = entries
+
+    def _completions_remove(self, cusoco: int) -> None:
+        for entry in self._completion_keys.pop(cusoco):
+            self._completions.pop(bisect_left(self._completions, entry))
+
+    def _completions_rebuild(self) -> None:
+        self._completion_keys = {soda["Cusoco"]: self._completion_entries(soda) for soda in self.fida}
+        self._completions = sorted(entry for entries in self._completion_keys.values() for entry in entries)
+
+    def autocomplete(self, prefix: str, count: int = 10) -> List[dict]:
+        """Returns up to count names and contents starting with prefix, ignoring case, in alphabetical order with
+        the cusocos of the sodas they are in"""
+
+        prefix = _normalize_text(prefix)
+
+        with self.lock.read():
+            completions = []
+            index = bisect_left(self._completions, (prefix,))
+
+            while index < len(self._completions):
+                normalized, text, cusoco = self._completions[index]
+
+                if not normalized.startswith(prefix):
+                    break
+
+                if completions and completions[-1]["Text"] == text:
+                    completions[-1]["Cusocos"].append(cusoco)
+
+                elif len(completions) < count:
+                    completions.append({"Text": text, "Cusocos": [cusoco]})
+
+                else:
+                    break
+
+                index += 1
+
+            return completions
+
+    # endregion
+    # region Numeric
+
+    def _numeric_entries(self, soda: dict) -> List[tuple]:
+        """Returns (attribute, value in the attribute's standard unit) of all numeric values of a soda"""
+
+        cusoco = soda["Cusoco"]
+        standard_units = self.header["Numeric attributes"]
+
+        entries = []
+        for attribute, values in soda["Numeric attributes"].items():
+            standard_unit = standard_units.get(attribute)
+
+            if standard_unit is None:
+                continue
+
+            for unit, numbers in values.items():
+                for number in numbers:
+                    entries.append((attribute, (_convert_number(number, unit, standard_unit, self.header), cusoco)))
+
+        return entries
+
+    def _numeric_add(self, soda: dict) -> None:
+        entries = self._numeric_entries(soda)
+
+        for attribute, entry in entries:
+            insort(self._numeric.setdefault(attribute, []), entry)
+
+        self._numeric_keys[soda["Cusoco"]] = entries
+
+    def _numeric_remove(self, cusoco: int) -> None:
+        for attribute, entry in self._numeric_keys.pop(cusoco):
+            index = self._numeric[attribute]
+            index.pop(bisect_left(index, entry))
+
+    def _numeric_rebuild(self, attributes: [list, None] = None) -> None:
+        """Rebuilds the indexes of some or all attributes, needed when their standard unit changed"""
+
+        if attributes is None:
+            self._numeric = {}
+            self._numeric_keys = {}
+
+            for soda in self.fida:
+                entries = self._numeric_entries(soda)
+                self._numeric_keys[soda["Cusoco"]] = entries
+
+                for attribute, entry in entries:
+                    self._numeric.setdefault(attribute, []).append(entry)
+
+            for index in self._numeric.values():
+                index.sort()
+
+            return
+
+        for attribute in attributes:
+            self._numeric.pop(attribute, None)
+
+        for soda in self.fida:
+            entries = [i for i in self._numeric_keys.pop(soda["Cusoco"], []) if i[0] not in attributes]
+            entries += [i for i in self._numeric_entries(soda) if i[0] in attributes]
+            self._numeric_keys[soda["Cusoco"]] = entries
+
+            for attribute, entry in entries:
+                if attribute in attributes:
+                    self._numeric.setdefault(attribute, []).append(entry)
+
+        for attribute in attributes:
+            if attribute in self._numeric:
+                self._numeric[attribute].sort()
+
+    def _to_standard(self, attribute: str, value: [int, float, str]) -> float:
+        if type(value) is not str:
+            return value
+
+        number, unit = separate_number_and_unit(value, self.header)
+        standard_unit = self.header["Numeric attributes"][attribute]
+
+        if unit not in get_unit_conversions(standard_unit, True, self.header):
+            raise AutodexException(f"E142 Unit {unit} is incompatible with {attribute}")
+
+        return _convert_number(number, unit, standard_unit, self.header)
+
+    def _from_standard(self, attribute: str, pairs: List[tuple], unit: [str, None]) -> List[list]:
+        if unit is None:
+            return [[value, cusoco] for value, cusoco in pairs]
+
+        standard_unit = self.header["Numeric attributes"][attribute]
+
+        if unit not in get_unit_conversions(standard_unit, True, self.header):
+            raise AutodexException(f"E142 Unit {unit} is incompatible with {attribute}")
+
+        return [[_convert_number(value, standard_unit, unit, self.header), cusoco] for value, cusoco in pairs]
+
+    def get_numeric_range(self, attribute: str, low: [int, float, str, None] = None,
+                          high: [int, float, str, None] = None, unit: [str, None] = None) -> List[list]:
+        """Returns [value, cusoco] of all values of a numeric attribute between low and high, ascending. Limits can
+        be numbers in the attribute's standard unit or values with units like "8 bar". Returned values are in unit,
+        or the standard unit if None. A soda is listed once for every matching value"""
+
+        with self.lock.read():
+            if attribute not in self.header["Numeric attributes"]:
+                raise AutodexException(f"E143 Invalid numeric attribute: {attribute}")
+
+            index = self._numeric.get(attribute, [])
+
+            start = 0 if low is None else bisect_left(index, (self._to_standard(attribute, low),))
+            end = len(index) if high is None else bisect_right(index, (self._to_standard(attribute, high),
+                                                                       float("inf")))
+
+            return self._from_standard(attribute, index[start:end], unit)
+
+    def get_numeric_top(self, attribute: str, count: int = 10, highest: bool = True,
+                        unit: [str, None] = None) -> List[list]:
+        """Returns [value, cusoco] of the count sodas with the highest or lowest values of a numeric attribute.
+        Each soda is listed once, with its highest or lowest value"""
+
+        with self.lock.read():
+            if attribute not in self.header["Numeric attributes"]:
+                raise AutodexException(f"E143 Invalid numeric attribute: {attribute}")
+
+            index = self._numeric.get(attribute, [])
+
+            pairs = []
+            seen = set()
+            for value, cusoco in (reversed(index) if highest else index):
+
+                if len(pairs) >= count:
+                    break
+
+                if cusoco not in seen:
+                    seen.add(cusoco)
+                    pairs.append((value, cusoco))
+
+            return self._from_standard(attribute, pairs, unit)
+
+    # endregion
+    # region Statistics
+
+    @staticmethod
+    def _stats_entries(soda: dict) -> List[tuple]:
+        """Returns (counter name, key) of every counter a soda adds 1 to"""
+
+        entries = [("By storage unit", soda["Storage unit"]), ("By container type", soda["Container type"])]
+        entries += [("By tag", tag) for tag in soda["Tags"]]
+        entries += [("Numeric attributes", attribute) for attribute in soda["Numeric attributes"].keys()]
+        entries += [("Categorical attributes", attribute) for attribute in soda["Categorical attributes"].keys()]
+
+        return entries
+
+    @classmethod
+    def _count_stats(cls, fida: List[dict]) -> dict:
+        counters = {name: collections.Counter() for name in
+                    ("By storage unit", "By container type", "By tag", "Numeric attributes", "Categorical attributes")}
+
+        for soda in fida:
+            for name, key in cls._stats_entries(soda):
+                counters[name][key] += 1
+
+        return counters
+
+    def _stats_add(self, soda: dict) -> None:
+        entries = self._stats_entries(soda)
+
+        for name, key in entries:
+            self._stats[name][key] += 1
+
+        self._stats_keys[soda["Cusoco"]] = entries
+
+    def _stats_remove(self, cusoco: int) -> None:
+        for name, key in self._stats_keys.pop(cusoco):
+            counter = self._stats[name]
+            counter[key] -= 1
+
+            if not counter[key]:
+                del counter[key]
+
+    def _stats_rebuild(self) -> None:
+        self._stats_keys = {soda["Cusoco"]: self._stats_entries(soda) for soda in self.fida}
+        self._stats = self._count_stats(self.fida)
+
+    def _format_stats(self, counters: dict, cells: dict) -> dict:
+        total = len(self._sodas)
+
+        stats = {"Sodas": total}
+
+        for name in ("By storage unit", "By container type", "By tag"):
+            stats[name] = dict(counters[name])
+
+        stats["Fill ratio"] = {storage_unit: len(cells[storage_unit]) / self._volume(storage_unit) * 100
+                               for storage_unit in self._cells.keys()}
+
+        stats["Numeric attribute coverage"] = {
+            attribute: counters["Numeric attributes"][attribute] / total * 100 if total else 0.0
+            for attribute in set(self.header["Numeric attributes"].keys()) | set(counters["Numeric attributes"])}
+
+        stats["Categorical attribute coverage"] = {
+            attribute: count / total * 100 for attribute, count in counters["Categorical attributes"].items()}
+
+        return stats
+
+    def get_stats(self, verify: bool = False) -> dict:
+        """Returns counts of sodas per storage unit, container type and tag, the percentage of cells taken up in
+        each storage unit, and the percentage of sodas having each attribute. Counters are kept up to date on every
+        change. With verify, everything is recomputed from the fida and compared, raising exception on mismatch"""
+
+        with self.lock.read():
+            stats = self._format_stats(self._stats, self._cells)
+
+            if verify:
+                cells = {storage_unit: set() for storage_unit in self._cells.keys()}
+                for soda in self.fida:
+                    cells[soda["Storage unit"]].update(_footprint(soda, self.header))
+
+                recomputed = self._format_stats(self._count_stats(self.fida), cells)
+
+                if recomputed != stats:
+                    raise AutodexException(f"E144 Statistics are inconsistent, expected {recomputed}, not {stats}")
+
+            return stats
+
+    # endregion
+    # region Postings
+
+    @staticmethod
+    def _posting_entries(soda: dict) -> List[tuple]:
+        entries = [("Storage unit", soda["Storage unit"]), ("Container type", soda["Container type"])]
+        entries += [("Tags", tag) for tag in soda["Tags"]]
+        entries += [("Categorical attributes", attribute, value)
+                    for attribute, values in soda["Categorical attributes"].items() for value in values]
+
+        return entries
+
+    def _postings_add(self, soda: dict) -> None:
+        entries = self._posting_entries(soda)
+
+        for entry in entries:
+            self._postings.setdefault(entry, set()).add(soda["Cusoco"])
+
+        self._posting_keys[soda["Cusoco"]] = entries
+
+    def _postings_remove(self, cusoco: int) -> None:
+        for entry in self._posting_keys.pop(cusoco):
+            postings = self._postings[entry]
+            postings.discard(cusoco)
+
+            if not postings:
+                del self._postings[entry]
+
+    def _postings_rebuild(self) -> None:
+        self._postings = {}
+        self._posting_keys = {}
+
+        for soda in self.fida:
+            self._postings_add(soda)
+
+    # endregion
+    # region Queries
+
+    @staticmethod
+    def _sorted_range(index: list, comparison: str, value: [int, float]) -> tuple:
+        """Returns start and end of the entries of a list of sorted (value, cusoco) matching a comparison"""
+
+        start = 0
+        end = len(index)
+
+        if comparison in ("=", ">="):
+            start = bisect_left(index, (value,))
+        elif comparison == ">":
+            start = bisect_right(index, (value, float("inf")))
+
+        if comparison in ("=", "<="):
+            end = bisect_right(index, (value, float("inf")))
+        elif comparison == "<":
+            end = bisect_left(index, (value,))
+
+        return start, max(start, end)
+
+    def _query_condition(self, field: str, comparison: str, value) -> dict:
+        """Returns the text, index, estimated number of candidates, candidate lookup and check of a query condition.
+        Conditions without an index have no estimate or candidates"""
+
+        text = f"{field} {comparison} {value}"
+        condition = {"Condition": text, "Index": None, "Estimate": None, "Candidates": None}
+
+        if comparison not in _query_comparisons and comparison != "contains":
+            raise AutodexException(f"E151 Invalid query comparison: {text}")
+
+        compare = _query_comparisons.get(comparison)
+
+        def invalid():
+            return AutodexException(f"E151 Invalid query condition: {text}")
+
+        if comparison == "contains":
+            if field not in ("Name", "Description", "Contents", "Tags") and (
+                    field in _query_fields or field in self.header["Numeric attributes"]):
+                raise invalid()
+
+            needle = _normalize_text(value)
+            sodas = self._sodas
+
+            # Names and contents are normalized in the autocomplete index already
+            if field == "Name":
+                condition["Check"] = lambda cusoco: needle in self._completion_keys[cusoco][0][0]
+            elif field == "Contents":
+                condition["Check"] = lambda cusoco: any(needle in i[0] for i in self._completion_keys[cusoco][1:])
+            elif field == "Description":
+                condition["Check"] = lambda cusoco: needle in _normalize_text(sodas[cusoco][field])
+            elif field == "Tags":
+                condition["Check"] = lambda cusoco: any(needle in _normalize_text(i) for i in sodas[cusoco][field])
+            else:
+                condition["Check"] = lambda cusoco: any(needle in _normalize_text(i) for i in
+                                                        sodas[cusoco]["Categorical attributes"].get(field, []))
+
+            return condition
+
+        if field == "Cusoco":
+            condition["Check"] = lambda cusoco: compare(cusoco, value)
+
+            if comparison == "=":
+                candidates = [value] if value in self._sodas else []
+                condition.update({"Index": "Cusocos", "Estimate": len(candidates), "Candidates": candidates})
+
+            return condition
+
+        if field == "Name" and comparison == "=":
+            cusoco = self._cusocos_by_name.get(value)
+            candidates = [] if cusoco is None else [cusoco]
+            condition.update({"Index": "Names", "Estimate": len(candidates), "Candidates": candidates,
+                              "Check": lambda cusoco: self._name_keys.get(cusoco) == value})
+
+            return condition
+
+        if field in ("Storage unit", "Container type", "Tags") and comparison == "=":
+            postings = self._postings.get((field, value), set())
+            condition.update({"Index": field, "Estimate": len(postings), "Candidates": list(postings),
+                              "Check": lambda cusoco: cusoco in self._postings.get((field, value), ())})
+
+            return condition
+
+        if field in ("Date created", "Date changed"):
+            epoch = self._to_epoch(value, None)
+            position = 0 if field == "Date created" else 1
+
+            def check(cusoco):
+                timestamp = self.timestamps[cusoco][position]
+                return timestamp is not None and compare(timestamp, epoch)
+
+            condition["Check"] = check
+
+            if field == "Date created":
+                start, end = self._sorted_range(self._created_index, comparison, epoch)
+                condition.update({"Index": "Date created", "Estimate": end - start,
+                                  "Candidates": list(map(itemgetter(1), self._created_index[start:end]))})
+
+            return condition
+
+        if field in self.header["Numeric attributes"]:
+            standard = self._to_standard(field, value)
+            index = self._numeric.get(field, [])
+            start, end = self._sorted_range(index, comparison, standard)
+
+            def check(cusoco):
+                return any(attribute == field and compare(entry[0], standard)
+                           for attribute, entry in self._numeric_keys.get(cusoco, ()))
+
+            condition.update({"Index": f"Numeric {field}", "Estimate": end - start,
+                              "Candidates": list(dict.fromkeys(map(itemgetter(1), index[start:end]))),
+                              "Check": check})
+
+            return condition
+
+        if field in _query_fields:
+            if comparison != "=" or field in ("Name", "Description"):
+                raise invalid()
+
+            condition["Check"] = lambda cusoco: value in self._sodas[cusoco][field]
+
+            return condition
+
+        if comparison != "=":
+            raise invalid()
+
+        postings = self._postings.get(("Categorical attributes", field, value), set())
+        condition.update({"Index": f"Categorical {field}", "Estimate": len(postings), "Candidates": list(postings),
+                          "Check": lambda cusoco: cusoco in self._postings.get(("Categorical attributes", field,
+                                                                                 value), ())})
+
+        return condition
+
+    def _sort_value(self, sort: str, descending: bool):
+        """Returns a function giving the value a soda is sorted by, None for sodas without one"""
+
+        if sort == "Cusoco":
+            return lambda cusoco: cusoco
+
+        if sort == "Name":
+            return lambda cusoco: self._completion_keys[cusoco][0][0]
+
+        if sort in ("Date created", "Date changed"):
+            position = 0 if sort == "Date created" else 1
+            return lambda cusoco: self.timestamps[cusoco][position]
+
+        if sort in self.header["Numeric attributes"]:
+            pick = max if descending else min
+
+            def value(cusoco):
+                values = [entry[0] for attribute, entry in self._numeric_keys.get(cusoco, ()) if attribute == sort]
+                return pick(values) if values else None
+
+            return value
+
+        raise AutodexException(f"E152 Invalid query sort: {sort}")
+
+    def _plan_query(self, conditions: List[tuple], sort: [str, None], descending: bool, limit: [int, None],
+                    offset: int) -> dict:
+        """Picks the cheapest way to start a query. Every condition with an index is a possible start, besides a
+        full scan and, when sorting by a numeric attribute or creation date, walking that sorted index. The costs
+        are the estimated numbers of sodas checked, assuming conditions are independent, plus sorting. The other
+        conditions are checked most selective first"""
+
+        total = len(self._sodas)
+        parsed = [self._query_condition(*i) for i in conditions]
+        sort_value = None if sort is None else self._sort_value(sort, descending)
+        wanted = None if limit is None else offset + limit
+
+        # Conditions without an index are assumed to match a tenth of the sodas
+        for condition in parsed:
+            condition["Selectivity"] = 0.1 if condition["Estimate"] is None else condition["Estimate"] / max(total, 1)
+
+        selectivity = 1.0
+        for condition in parsed:
+            selectivity *= condition["Selectivity"]
+
+        matches = total * selectivity
+
+        def sort_cost(count: float) -> float:
+            return count * max(1.0, math.log2(count)) if count > 1 else 0.0
+
+        plans = []
+        for condition in [None] + [i for i in parsed if i["Estimate"] is not None]:
+            candidates = total if condition is None else condition["Estimate"]
+
+            if sort is None and wanted is not None and matches:
+                checked = min(candidates, wanted * candidates / matches)
+            else:
+                checked = candidates
+
+            plans.append({"Start": "Full scan" if condition is None else condition["Condition"],
+                          "Index": None if condition is None else condition["Index"],
+                          "Estimated candidates": candidates,
+                          "Sort method": None if sort is None else "Sort matches",
+                          "Estimated cost": checked + (sort_cost(min(matches, candidates)) if sort else 0),
+                          "Driver": condition})
+
+        if sort is not None and (sort == "Date created" or sort in self.header["Numeric attributes"]):
+            index = self._created_index if sort == "Date created" else self._numeric.get(sort, [])
+
+            if wanted is not None and selectivity:
+                checked = min(len(index) + total, wanted / selectivity)
+            else:
+                checked = len(index) + total
+
+            plans.append({"Start": f"Walk {sort} index", "Index": sort, "Estimated candidates": len(index),
+                          "Sort method": "Index order", "Estimated cost": checked, "Driver": None})
+
+        best = min(plans, key=itemgetter("Estimated cost"))
+
+        return {"Plan": best,
+                "Alternatives": [i for i in plans if i is not best],
+                "Filters": sorted([i for i in parsed if i is not best["Driver"]], key=itemgetter("Selectivity")),
+                "Estimated matches": matches,
+                "Sort value": sort_value}
+
+    def _explain_query(self, conditions: List[tuple], sort: [str, None], descending: bool, limit: [int, None],
+                       offset: int) -> dict:
+        with self.lock.read():
+            plan = self._plan_query(conditions, sort, descending, limit, offset)
+
+        def describe(chosen: dict) -> dict:
+            return {key: round(value) if type(value) is float else value
+                    for key, value in chosen.items() if key != "Driver"}
+
+        explanation = describe(plan["Plan"])
+        explanation["Filters"] = [i["Condition"] for i in plan["Filters"]]
+        explanation["Sort"] = None if sort is None else f"{sort} {'descending' if descending else 'ascending'}"
+        explanation["Offset"] = offset
+        explanation["Limit"] = limit
+        explanation["Estimated matches"] = round(plan["Estimated matches"])
+        explanation["Alternatives"] = [describe(i) for i in plan["Alternatives"]]
+
+        return explanation
+
+    def _run_query(self, conditions: List[tuple], sort: [str, None], descending: bool, limit: [int, None],
+                   offset: int, chunk: int = 256):
+        """Yields copies of matching sodas. The read lock is only held while a chunk of candidates is checked, not
+        while the caller works with the results"""
+
+        with self.lock.read():
+            plan = self._plan_query(conditions, sort, descending, limit, offset)
+            chosen = plan["Plan"]
+            checks = [i["Check"] for i in plan["Filters"]]
+
+            if chosen["Sort method"] == "Sort matches":
+                found = list(self._sodas.keys()) if chosen["Driver"] is None else chosen["Driver"]["Candidates"]
+
+                for check in checks:
+                    found = list(filter(check, found))
+
+                sort_value = plan["Sort value"]
+                values = list(map(sort_value, found))
+
+                ordered = sorted((value, cusoco) for value, cusoco in zip(values, found) if value is not None)
+                if descending:
+                    ordered.reverse()
+
+                ordered = [i[1] for i in ordered] + sorted(cusoco for value, cusoco in zip(values, found)
+                                                           if value is None)
+                end = None if limit is None else offset + limit
+
+                results = [copy.deepcopy(self._sodas[cusoco]) for cusoco in ordered[offset:end]]
+
+            else:
+                results = None
+
+                if chosen["Sort method"] == "Index order":
+                    index = self._created_index if sort == "Date created" else self._numeric.get(sort, [])
+                    walked = list(map(itemgetter(1), reversed(index) if descending else index))
+
+                    def remaining():
+                        # Sodas with several values are in the index several times, only the first counts
+                        seen = set()
+
+                        for cusoco in walked:
+                            if cusoco not in seen:
+                                seen.add(cusoco)
+                                yield cusoco
+
+                        # Runs when the walk is done, while a chunk holds the lock
+                        if sort != "Date created":
+                            yield from sorted(cusoco for cusoco, soda in self._sodas.items()
+                                              if sort not in soda["Numeric attributes"])
+
+                    candidates = remaining()
+
+                elif chosen["Driver"] is None:
+                    candidates = iter(list(self._sodas.keys()))
+
+                else:
+                    candidates = iter(chosen["Driver"]["Candidates"])
+
+        if results is not None:
+            yield from results
+            return
+
+        skipped = 0
+        produced = 0
+
+        while limit is None or produced < limit:
+            with self.lock.read():
+                found = list(itertools.islice(candidates, chunk))
+                exhausted = len(found) < chunk
+
+                # Sodas deleted since the plan was made are left out
+                found = list(filter(self._sodas.__contains__, found))
+                for check in checks:
+                    found = list(filter(check, found))
+
+                if skipped < offset:
+                    skip = min(offset - skipped, len(found))
+                    skipped += skip
+                    found = found[skip:]
+
+                if limit is not None:
+                    found = found[:limit - produced]
+
+                batch = [copy.deepcopy(self._sodas[cusoco]) for cusoco in found]
+
+            produced += len(batch)
+            yield from batch
+
+            if exhausted:
+                break
+
+    def query(self, conditions: [List[tuple], None] = None, sort: [str, None] = None, descending: bool = False,
+              limit: [int, None] = None, offset: int = 0) -> Query:
+        """Returns a query for sodas matching all conditions, see Query"""
+
+        return Query(self, conditions or [], sort, descending, limit, offset)
+
+    # endregion
+    # region Sync
+
+    def export_delta(self, since=None, since_version: [int, None] = None) -> dict:
+        """Returns the sodas changed, created or deleted after since or since_version, and the header if it was
+        changed. since can be a datetime, a date string in the header's format or epoch seconds. With neither
+        given, everything is exported. Deletions are only known for this store's lifetime"""
+
+        with self.lock.read():
+
+            if since_version is not None:
+                cusocos = [cusoco for cusoco, version in self._soda_versions.items() if version > since_version]
+                deleted = [[cusoco, epoch] for cusoco, (version, epoch) in self._deleted.items()
+                           if version > since_version]
+                header_changed = self._header_version > since_version
+
+            else:
+                since = self._to_epoch(since, float("-inf"))
+                cusocos = [cusoco for _, cusoco in
+                           self._touched_index[bisect_right(self._touched_index, (since, float("inf"))):]]
+                deleted = [[cusoco, epoch] for cusoco, (_, epoch) in self._deleted.items() if epoch > since]
+                header_changed = self._header_changed > since
+
+            return {"Autodex delta": self.header.get("Autodex version"),
+                    "Version": self.version,
+                    "Header": copy.deepcopy(self.header) if header_changed else None,
+                    "Sodas": [copy.deepcopy(self._sodas[cusoco]) for cusoco in sorted(cusocos)],
+                    "Deleted": deleted}
+
+    def merge(self, other: [dict, list], commit: bool,
+              policy: [Literal["newer", "local", "remote"], Callable[[dict, dict], dict]] = "newer",
+              base: [list, None] = None) -> [str, dict]:
+        """Merges a delta from export_delta or a full [header, fida] file into the store, matching sodas by cusoco.
+        With base, the [header, fida] both sides started from, only sodas changed on both sides are conflicts.
+        Conflicts are resolved by the newer Date changed, by always keeping one side, or by a callback that gets
+        the local and the remote soda (None if deleted) and returns the soda to keep (None to delete).
+        Only touched sodas are re-validated unless the header changed"""
+
+        with self.lock.write() if commit else self.lock.read():
+            return self._merge(other, commit, policy, base)
+
+    def _merge(self, other: [dict, list], commit: bool, policy, base: [list, None]) -> [str, dict]:
+        date_format = self.header["Date format"]
+
+        # region Parse input
+
+        if type(other) is dict and "Autodex delta" in other.keys():
+
+            if (not other.keys() >= {"Header", "Sodas", "Deleted"} or type(other["Header"]) not in (dict, type(None))
+                    or type(other["Sodas"]) is not list or type(other["Deleted"]) is not list):
+                return "E132 Delta must have a Header dict or None, and Sodas and Deleted lists"
+
+            for deleted in other["Deleted"]:
+                if (type(deleted) is not list or len(deleted) != 2 or type(deleted[0]) is not int
+                        or type(deleted[1]) not in (int, float)):
+                    return f"E132 Deleted sodas must be [cusoco, epoch seconds], not {deleted}"
+
+            remote_header = other["Header"]
+            remote_fida = other["Sodas"]
+            remote_deleted = other["Deleted"]
+            full = False
+
+        elif type(other) is list and len(other) == 2 and type(other[0]) is dict and type(other[1]) is list:
+            remote_header, remote_fida = other
+            remote_deleted = []
+            full = True
+
+        else:
+            return f"E132 Can only merge a delta or a [header, fida] file, not {type(other)}"
+
+        if remote_header is not None:
+            for section in ("Storage units", "Container types", "Unit conversions", "Numeric attributes"):
+
+                if type(remote_header.get(section, {})) is not dict:
+                    return f"E132 Merged header {section} must be dict, not {type(remote_header[section])}"
+
+        now = datetime.datetime.now()
+
+        for soda in remote_fida:
+            if type(soda) is not dict or type(soda.get("Cusoco")) is not int:
+                return f"E133 Merged sodas must be dicts with an int Cusoco: {soda}"
+
+            # The dates decide conflicts, so they're checked before anything else
+            check_return = (_soda_structure_check(soda) or _soda_date_created_check(soda, self.header, now)
+                            or _soda_date_changed_check(soda, self.header, now))
+            if check_return:
+                return f"E133 Merged soda #{soda['Cusoco']}: {check_return}"
+
+        base_header = None
+        base_sodas = None
+        if base is not None:
+
+            if type(base) is not list or len(base) != 2 or type(base[0]) is not dict or type(base[1]) is not list:
+                return f"E132 Base must be a [header, fida] file, not {type(base)}"
+
+            base_header, base_fida = base
+
+            for section in ("Storage units", "Container types", "Unit conversions", "Numeric attributes"):
+                if type(base_header.get(section, {})) is not dict:
+                    return f"E132 Base header {section} must be dict, not {type(base_header[section])}"
+
+            for soda in base_fida:
+                if type(soda) is not dict or type(soda.get("Cusoco")) is not int:
+                    return f"E133 Base sodas must be dicts with an int Cusoco: {soda}"
+
+            base_sodas = {soda["Cusoco"]: soda for soda in base_fida}
+
+        # endregion
+        # region Sodas
+
+        local = self._sodas
+        remote = {soda["Cusoco"]: soda for soda in remote_fida}
+        result = {}
+        conflicts = []
+
+        def touched(soda: dict) -> float:
+            return _parse_date(soda["Date changed"] or soda["Date created"], date_format)
+
+        def resolve(local_soda: [dict, None], remote_soda: [dict, None], deleted_at: [float, None] = None):
+            conflicts.append((local_soda or remote_soda)["Cusoco"])
+
+            if callable(policy):
+                return policy(local_soda, remote_soda)
+
+            if policy == "local":
+                return local_soda
+
+            if policy == "remote":
+                return remote_soda
+
+            if policy != "newer":
+                raise AutodexException(f"E134 Invalid merge policy: {policy}")
+
+            if remote_soda is None:
+                if deleted_at is not None and deleted_at > touched(local_soda):
+                    return None
+                return local_soda
+
+            if local_soda is None:
+                return remote_soda
+
+            return remote_soda if touched(remote_soda) > touched(local_soda) else local_soda
+
+        for cusoco, remote_soda in remote.items():
+            local_soda = local.get(cusoco)
+
+            if local_soda == remote_soda:
+                continue
+
+            if base_sodas is not None and cusoco in base_sodas:
+                base_soda = base_sodas[cusoco]
+
+                if local_soda == base_soda:
+                    result[cusoco] = remote_soda
+                elif remote_soda != base_soda:
+                    result[cusoco] = resolve(local_soda, remote_soda)
+
+            elif local_soda is None:
+                result[cusoco] = remote_soda
+
+            else:
+                result[cusoco] = resolve(local_soda, remote_soda)
+
+        if full and base_sodas is not None:
+            for cusoco, local_soda in local.items():
+
+                if cusoco in remote or cusoco not in base_sodas:
+                    continue
+
+                if local_soda == base_sodas[cusoco]:
+                    result[cusoco] = None
+                else:
+                    result[cusoco] = resolve(local_soda, None)
+
+        for cusoco, deleted_at in remote_deleted:
+            local_soda = local.get(cusoco)
+
+            if local_soda is None:
+                continue
+
+            if touched(local_soda) > deleted_at:
+                result[cusoco] = resolve(local_soda, None, deleted_at)
+            else:
+                result[cusoco] = None
+
+        changes = {"Added": [], "Changed": [], "Deleted": [], "Conflicts": sorted(conflicts), "Header": []}
+
+        for cusoco, soda in result.items():
+            local_soda = local.get(cusoco)
+
+            if soda is None and local_soda is not None:
+                changes["Deleted"].append(cusoco)
+            elif soda is not None and local_soda is None:
+                changes["Added"].append(cusoco)
+            elif soda is not None and soda != local_soda:
+                changes["Changed"].append(cusoco)
+
+        for key in ("Added", "Changed", "Deleted"):
+            changes[key].sort()
+
+        for cusoco in changes["Added"] + changes["Changed"]:
+            result[cusoco] = copy.deepcopy(result[cusoco])
+
+        # endregion
+        # region Header
+
+        header = self.header
+        if remote_header is not None:
+
+            for section in ("Storage units", "Container types", "Unit conversions", "Numeric attributes"):
+                local_section = self.header[section]
+                base_section = base_header.get(section, {}) if base_header is not None else {}
+
+                for key, value in remote_header.get(section, {}).items():
+
+                    if key in local_section and local_section[key] == value:
+                        continue
+
+                    if key in local_section and (key not in base_section or local_section[key] != base_section[key]):
+                        continue
+
+                    if header is self.header:
+                        header = self.header.copy()
+
+                    if header[section] is self.header[section]:
+                        header[section] = self.header[section].copy()
+
+                    header[section][key] = copy.deepcopy(value)
+                    changes["Header"].append(f"{section}: {key}")
+
+        # endregion
+        # region Validate
+
+        new_fida = []
+        for soda in self.fida:
+            cusoco = soda["Cusoco"]
+
+            if cusoco not in result:
+                new_fida.append(soda)
+            elif result[cusoco] is not None:
+                new_fida.append(result[cusoco])
+
+        new_fida += [result[cusoco] for cusoco in changes["Added"]]
+
+        if changes["Header"]:
+            header_check_return = _header_check(header)
+            if header_check_return:
+                return f"E135 Merged header: {header_check_return}"
+
+            fida_check_return = fida_check(new_fida, header)
+            if fida_check_return:
+                return f"E136 Merged fida: {fida_check_return}"
+
+        else:
+            check_return = self._replacement_check([result[cusoco] for cusoco in changes["Changed"] + changes["Added"]],
+                                                   set(changes["Changed"] + changes["Deleted"]), header, now)
+            if check_return:
+                return f"E136 Merged fida: {check_return}"
+
+        # endregion
+
+        if commit and changes["Header"]:
+            self.fida = new_fida
+            self.header = header
+
+            # New storage units have no cells yet, so the indexes are rebuilt with the new header instead
+            self._index_rebuild()
+
+            for cusoco in changes["Deleted"]:
+                self._versions_remove(cusoco)
+
+            for cusoco in changes["Changed"] + changes["Added"]:
+                self._versions_add(cusoco)
+
+            self._header_changed_now()
+
+        elif commit:
+            for cusoco in changes["Deleted"] + changes["Changed"]:
+                self._index_remove(local[cusoco])
+
+            self.fida = new_fida
+
+            for cusoco in changes["Changed"] + changes["Added"]:
+                self._index_add(result[cusoco])
+
+        return changes
+
+    # endregion
+
+    def export_read_only(self, path: str) -> None:
+        """Writes header and fida to an indexed file for open_read_only"""
+
+        with self.lock.read():
+            _write_indexed_file(path, self.header, self.fida)
+
+    def get_fida(self) -> List[dict]:
+        """Copies fida. Use this instead of fida.copy() to avoid working with fida directly"""
+
+        with self.lock.read():
+            return self.fida.copy()
+
+    def get_header(self) -> dict:
+        """Copies header. Use this instead of header.copy() to avoid working with header directly"""
+
+        with self.lock.read():
+            return self.header.copy()
+
+    def change_numeric_attributes(
+            self,
+            attribute: str,
+            operation:
+            Literal["change standard unit", "change unit bases", "rename", "merge", "add", "delete"],
+            commit: bool,
+            unit: str = None,
+            rename_to: str = None,
+            merge_into: str = None) -> [str, list, Literal[True]]:
+        """Change numeric attributes in the header. Makes changes to fida if required"""
+
+        with self.lock.write():
+            result = self._change_numeric_attributes(attribute, operation, commit, unit, rename_to, merge_into)
+
+            if commit and type(result) is list:
+                self._index_refresh(result)
+
+            if commit and operation in ("change standard unit", "merge") and type(result) is not str:
+                self._numeric_rebuild([attribute, merge_into])
+
+            if commit and type(result) is not str:
+                self._header_changed_now()
+
+            return result
+
+    def _change_numeric_attributes(
+            self,
+            attribute: str,
+            operation:
+            Literal["change standard unit", "change unit bases", "rename", "merge", "add", "delete"],
+            commit: bool,
+            unit: str = None,
+            rename_to: str = None,
+            merge_into: str = None) -> [str, list, Literal[True]]:
+        """Unlocked implementation of change_numeric_attributes"""
+
+        numeric_attributes = self.header["Numeric attributes"]
+
+        if operation in ["change standard unit", "change unit bases", "rename", "merge", "delete"]:
+
+            if attribute not in numeric_attributes.keys():
+                return "E100 Invalid attribute"
+
+        if operation in ["change standard unit", "change unit bases", "add"]:
+
+            if unit_check(unit, False, self.header):
+                return "E101 Invalid unit"
+
+        if operation in ["change standard unit", "change unit bases"]:
+
+            if unit == numeric_attributes[attribute]:
+                return "E102 Unit already saved"
+
+        if operation == "change standard unit":
+
+            if unit not in get_unit_conversions(numeric_attributes[attribute], True, self.header):
+                return "E103 Unit is in a different unit base"
+
+            if commit:
+                self.header["Numeric attributes"][attribute] = unit
+
+            return True
+
+        if operation == "change unit bases":
+
+            if unit in get_unit_conversions(numeric_attributes[attribute], True, self.header):
+                return "E104 Unit is in the same unit base"
+
+            self.header["Numeric attributes"][attribute] = unit.strip()
+
+            changes_list = []
+            for index in range(len(self.fida)):
+                soda = self.fida[index]
+
+                if attribute in soda["Numeric attributes"].keys():
+                    changes_list.append(soda["Cusoco"])
+
+                    if commit:
+                        soda["Numeric attributes"].pop(attribute)
+                        soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
+                                                                          self.header["Date format"])
+
+            return changes_list
+
+        if operation == "rename":
+
+            if attribute == rename_to:
+                return "E105 New attribute name mustn't be the same"
+
+            if rename_to in numeric_attributes.keys():
+                return "E106 New attribute name already taken"
+
+            if not rename_to.strip():
+                return "E107 New attribute name mustn't be empty"
+
+            changes_list = []
+            for index in range(len(self.fida)):
+                soda = self.fida[index]
+
+                if attribute in soda["Numeric attributes"].keys():
+                    changes_list.append(soda["Cusoco"])
+
+                    if commit:
+                        soda["Numeric attributes"][rename_to] = soda["Numeric attributes"].pop(attribute)
+                        soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
+                                                                          self.header["Date format"])
+
+            if commit:
+                self.header["Numeric attributes"][rename_to] = self.header["Numeric attributes"].pop(attribute)
+
+            return changes_list
+
+        if operation == "merge":
+
+            if merge_into not in numeric_attributes.keys():
+                return "E108 Invalid merge-into attribute"
+
+            if merge_into == attribute:
+                return "E109 Attribute mustn't merge with itself"
+
+            if numeric_attributes[attribute] not in get_unit_conversions(numeric_attributes[merge_into], True,
+                                                                         self.header):
+                return "E110 Attributes must have the same unit base"
+
+            changes_list = []
+            for index in range(len(self.fida)):
+                soda = self.fida[index]
+
+                if attribute in soda["Numeric attributes"].keys():
+                    changes_list.append(soda["Cusoco"])
+
+                    if commit:
+                        if merge_into in soda["Numeric attributes"].keys():
+
+                            old_dict = soda["Numeric attributes"].pop(attribute)
+                            new_dict = soda["Numeric attributes"][merge_into]
+                            merged_dict = new_dict.copy()
+
+                            for key, value in old_dict.items():
+
+                                if key in new_dict.keys():
+                                    merged_dict[key] = list(set(merged_dict[key]).union(value))
+
+                                else:
+                                    merged_dict[key] = value
+
+                            soda["Numeric attributes"][merge_into] = merged_dict
+
+                        else:
+                            soda["Numeric attributes"][merge_into] = soda["Numeric attributes"].pop(attribute)
+
+                        soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
+                                                                          self.header["Date format"])
+
+            if commit:
+                self.header["Numeric attributes"].pop(attribute)
+
+            return changes_list
+
+        if operation == "add":
+
+            if attribute in numeric_attributes.keys():
+                return "E111 Attribute exists already"
+
+            attribute = attribute.strip()
+
+            if not attribute:
+                return "E112 Attribute name mustn't be empty"
+
+            if commit:
+                self.header["Numeric attributes"][attribute] = unit.strip()
+
+            return True
+
+        if operation == "delete":
+
+            changes_list = []
+            for index in range(len(self.fida)):
+                soda = self.fida[index]
+
+                if attribute in soda["Numeric attributes"].keys():
+                    changes_list.append(soda["Cusoco"])
+
+                    if commit:
+                        soda["Numeric attributes"].pop(attribute)
+
+                        soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(),
+                                                                          self.header["Date format"])
+
+            if commit:
+                self.header["Numeric attributes"].pop(attribute)
+
+            return changes_list
+
+        raise AutodexException(f"E008 Invalid operation: {operation}")
+
+    # region Prepared operations
+
+    def prepare_add_soda(self, soda: dict) -> [str, PreparedOperation]:
+        """Validates adding a soda like add_soda with commit=False, and returns an operation for commit_prepared"""
+
+        with self.lock.read():
+            return self._prepare_add_soda(soda)
+
+    def prepare_delete_soda(self, cusoco: int) -> [str, PreparedOperation]:
+        """Validates deleting a soda like delete_soda with commit=False, and returns an operation for
+        commit_prepared"""
+
+        with self.lock.read():
+            return self._prepare_delete_soda(cusoco)
+
+    def prepare_change_soda(self, cusoco: int, changed_soda: dict) -> [str, PreparedOperation]:
+        """Validates changing a soda like change_soda with commit=False, and returns an operation for
+        commit_prepared"""
+
+        with self.lock.read():
+            return self._prepare_change_soda(cusoco, changed_soda)
+
+    def commit_prepared(self, prepared: PreparedOperation) -> [str, list]:
+        """Applies a prepared operation. Its validation is reused if the store didn't change since, otherwise it's
+        prepared again first. Error strings of prepare calls are returned as they are"""
+
+        if type(prepared) is str:
+            return prepared
+
+        with self.lock.write():
+            if prepared.store is not self:
+                raise AutodexException("E150 Prepared operation belongs to a different store")
+
+            if prepared.version != self.version or (prepared.target is not None and
+                                                    self._sodas.get(prepared.cusoco) is not prepared.target):
+
+                preparers = {"add": self._prepare_add_soda,
+                             "delete": self._prepare_delete_soda,
+                             "change": self._prepare_change_soda}
+
+                prepared = preparers[prepared.operation](*prepared.arguments)
+                if type(prepared) is str:
+                    return prepared
+
+            return self._apply_prepared(prepared)
+
+    def _apply_prepared(self, prepared: PreparedOperation) -> list:
+        soda = prepared.soda
+        cusoco = prepared.cusoco
+
+        if prepared.operation == "add":
+            self._sodas[soda["Cusoco"]] = soda
+            if self._fida is not None:
+                self._fida.append(soda)
+
+            self._index_add(soda)
+
+        elif prepared.operation == "delete":
+            self._index_remove(prepared.target)
+            del self._sodas[cusoco]
+            self._fida = None
+
+        else:
+            self._index_remove(prepared.target)
+
+            if soda["Cusoco"] == cusoco:
+                self._sodas[cusoco] = soda
+
+            else:
+                # A new cusoco would move the soda to the end, rebuild to keep its position
+                self._sodas = {(soda["Cusoco"] if key == cusoco else key): (soda if key == cusoco else value)
+                               for key, value in self._sodas.items()}
+
+            self._fida = None
+            self._index_add(soda)
+
+        return [cusoco]
+
+    # endregion
+
+    def add_soda(self, soda: dict, commit: bool) -> [str, list]:
+        """Creates a new soda in fida"""
+
+        with self.lock.write() if commit else self.lock.read():
+            return self._add_soda(soda, commit)
+
+    def _add_soda(self, soda: dict, commit: bool) -> [str, list]:
+        prepared = self._prepare_add_soda(soda)
+        if type(prepared) is str:
+            return prepared
+
+        if commit:
+            return self._apply_prepared(prepared)
+
+        return [prepared.cusoco]
+
+    def _prepare_add_soda(self, soda: dict) -> [str, PreparedOperation]:
+        arguments = (soda,)
+        soda = soda.copy()
+
+        if "Date created" in soda.keys() or "Date changed" in soda.keys():
+            return "E113 Soda mustn't contain Date created or Date changed"
+
+        soda["Date created"] = datetime.datetime.strftime(datetime.datetime.now(), self.header["Date format"])
+        soda["Date changed"] = ""
+
+        check_return = self._collective_check(soda)
+
+        if check_return:
+            return f"E114 {check_return}"
+
+        return PreparedOperation(self, "add", arguments, soda["Cusoco"], soda)
+
+    def delete_soda(self, cusoco: int, commit: bool) -> [str, list]:
+        """Deletes a soda in fida"""
+
+        with self.lock.write() if commit else self.lock.read():
+            return self._delete_soda(cusoco, commit)
+
+    def _delete_soda(self, cusoco: int, commit: bool) -> [str, list]:
+        prepared = self._prepare_delete_soda(cusoco)
+        if type(prepared) is str:
+            return prepared
+
+        if commit:
+            return self._apply_prepared(prepared)
+
+        return [cusoco]
+
+    def _prepare_delete_soda(self, cusoco: int) -> [str, PreparedOperation]:
+        soda = self._sodas.get(cusoco)
+
+        if soda is None:
+            return "E115 Invalid cusoco"
+
+        return PreparedOperation(self, "delete", (cusoco,), cusoco, None, soda)
+
+    def change_soda(self, cusoco: int, changed_soda: dict, commit: bool) -> [str, list]:
+        """Changes a soda in fida"""
+
+        with self.lock.write() if commit else self.lock.read():
+            return self._change_soda(cusoco, changed_soda, commit)
+
+    def _change_soda(self, cusoco: int, changed_soda: dict, commit: bool) -> [str, list]:
+        prepared = self._prepare_change_soda(cusoco, changed_soda)
+        if type(prepared) is str:
+            return prepared
+
+        if commit:
+            return self._apply_prepared(prepared)
+
+        return [cusoco]
+
+    def _prepare_change_soda(self, cusoco: int, changed_soda: dict) -> [str, PreparedOperation]:
+        if "Date created" in changed_soda.keys() or "Date changed" in changed_soda.keys():
+            return "E116 Soda mustn't contain Date created or Date changed"
+
+        soda = self._sodas.get(cusoco)
+
+        if soda is None:
+            return "E118 Invalid cusoco"
+
+        new_soda = soda.copy()
+        new_soda.update(changed_soda)
+        new_soda["Date changed"] = datetime.datetime.strftime(datetime.datetime.now(), self.header["Date format"])
+
+        check_return = self._collective_check(new_soda, replaced=cusoco)
+        if check_return:
+            return f"E117 {check_return}"
+
+        return PreparedOperation(self, "change", (cusoco, changed_soda), cusoco, new_soda, soda)
+
+    def file_changed(self, path: [str, None] = None) -> bool:
+        """Checks if the file was changed since it was last loaded or saved by this store. Size and modification
+        time are compared first, the content hash only if those differ. If only the modification time changed,
+        it's remembered"""
+
+        if path is None:
+            path = self.path
+
+        fingerprint = self.fingerprint
+
+        if fingerprint is None:
+            return True
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return True
+
+        if stat.st_size == fingerprint["Size"] and stat.st_mtime_ns == fingerprint["Mtime"]:
+            return False
+
+        current = _fingerprint(path)
+        if current["Hash"] != fingerprint["Hash"]:
+            return True
+
+        # Same content with a new modification time, like after touch, so the next call doesn't hash it again
+        if path == self.path:
+            self.fingerprint = current
+
+        return False
+
+    def save_file(self, path: [str, None] = None, fida: [list, None] = None, header: [dict, None] = None,
+                  overwrite_external: bool = False,
+                  file_format: Literal["json", "snapshot", None] = None) -> [None, str]:
+        """Saves fida and header to the file at the path. Raises exception if the file was changed by someone else
+        since it was loaded, unless overwrite_external is True. Without a file format, the format of the existing
+        file is kept, and new files are JSON"""
+
+        if path is None:
+            path = self.path
+
+        if file_format is None:
+            file_format = "snapshot" if Path(path).exists() and _is_snapshot_file(path) else "json"
+
+        if file_format not in ("json", "snapshot"):
+            raise AutodexException(f"E149 Invalid file format: {file_format}")
+
+        with _locked_file(path, True):
+
+            if (not overwrite_external and path == self.path and self.fingerprint is not None
+                    and Path(path).exists() and self.file_changed(path)):
+                raise AutodexException("E130 File was changed externally since it was loaded, reload it first")
+
+            with self.lock.read():
+                if fida is None:
+                    fida = self.fida.copy()
+
+                if header is None:
+                    header = self.header.copy()
+
+                fida_check_return = fida_check(fida, header)
+                if fida_check_return:
+                    raise AutodexException(f"E010 Fida: {fida_check_return}")
+
+                header_check_return = _header_check(header)
+                if header_check_return:
+                    raise AutodexException(f"E011 Header: {header_check_return}")
+
+                final_header = header.copy()
+                final_header["Last saved"] = datetime.datetime.now().strftime(header["Date format"])
+
+                final_fida = sorted(fida.copy(), key=itemgetter("Cusoco"))
+
+                final_data = [final_header, final_fida]
+
+                temp_save_path = path + ".tmp"
+
+                if file_format == "snapshot":
+                    with open(temp_save_path, "wb") as temp_file:
+                        temp_file.write(_encode_snapshot(final_header, final_fida))
+
+                else:
+                    with open(temp_save_path, "w", encoding="utf-8") as temp_file:
+                        json.dump(final_data, temp_file, indent=2)
+
+            file_check_return = _file_check(temp_save_path)
+            if file_check_return:
+                raise AutodexException(f"E012 Temp save file: {file_check_return}")
+
+            shutil.move(temp_save_path, path)
+
+            if path == self.path:
+                self.fingerprint = _fingerprint(path)
+
+    def load_file(self, path: [str, None] = None,
+                  progress: [Callable[[int, int, int], None], None] = None) -> None:
+        """Loads contents of a file into header and fida. JSON files are read in chunks, checking each soda as it's
+        decoded, and progress is called with bytes read, file size and sodas read so far. With warm_start, the
+        checked header, fida and indexes are kept next to the file as path + ".warm", and restored from there
+        without checking again as long as size, modification time and content hash of the file are the same"""
+
+        if path is None:
+            path = self.path
+
+        warm_path = path + ".warm"
+
+        with _locked_file(path, False):
+            fingerprint = _fingerprint(path) if Path(path).is_file() else None
+
+            state = None
+            if self.warm_start and fingerprint is not None:
+                state = _read_warm_cache(warm_path, fingerprint)
+
+            if state is None:
+                timestamps = {}
+
+                try:
+                    with _gc_paused():
+                        stream = _checked_stream(path, progress, timestamps)
+                        header = next(stream)
+                        fida = list(stream)
+
+                except AutodexException as error:
+                    raise AutodexException(f"E013 Couldn't load file: {error}")
+
+            elif progress is not None:
+                progress(fingerprint["Size"], fingerprint["Size"], len(state["Fida"]))
+
+        with self.lock.write():
+            if state is None:
+                self.header = header
+                self.fida = fida
+
+                with _gc_paused():
+                    self._index_rebuild(timestamps)
+
+            else:
+                self._restore_warm_state(state)
+
+            self.path = path
+            self.fingerprint = fingerprint
+            self._reset_versions()
+
+            if self.warm_start and state is None:
+                try:
+                    _write_warm_cache(warm_path, fingerprint, self._warm_state())
+                except OSError:
+                    pass
+
+    def reload(self) -> dict:
+        """Loads external changes of the file. Only sodas whose cusoco is new or whose content or Date changed
+        differs are re-validated. Changes to the header, or duplicate cusocos, fall back to a full load. Returns
+        the cusocos that were added, changed and deleted"""
+
+        changes = {"Added": [], "Changed": [], "Deleted": []}
+
+        with _locked_file(self.path, False):
+
+            if not self.file_changed():
+                return changes
+
+            try:
+                fingerprint = _fingerprint(self.path)
+                data = _read_data(self.path)
+
+            except FileNotFoundError:
+                raise AutodexException("E131 Couldn't reload file: E091 File not found")
+
+            except (json.decoder.JSONDecodeError, UnicodeDecodeError, AutodexException) as error:
+                raise AutodexException(f"E131 Couldn't reload file: E090 Couldn't decode file: {error}")
+
+            if type(data) is not list or len(data) != 2 or type(data[0]) is not dict or type(data[1]) is not list:
+                raise AutodexException("E131 Couldn't reload file: invalid file structure")
+
+            header, fida = data
+
+            with self.lock.write():
+                old_header = self.header.copy()
+                old_header.pop("Last saved", None)
+                new_header = header.copy()
+                new_header.pop("Last saved", None)
+
+                new_sodas = {}
+                for soda in fida:
+
+                    if type(soda) is not dict or type(soda.get("Cusoco")) is not int or soda["Cusoco"] in new_sodas:
+                        new_sodas = None
+                        break
+
+                    new_sodas[soda["Cusoco"]] = soda
+
+                if new_sodas is None or old_header != new_header:
+                    full = True
+
+                else:
+                    full = False
+                    old_sodas = self._sodas
+
+                    for cusoco, soda in new_sodas.items():
+                        old_soda = old_sodas.get(cusoco)
+
+                        if old_soda is None:
+                            changes["Added"].append(cusoco)
+
+                        elif old_soda["Date changed"] != soda["Date changed"] or old_soda != soda:
+                            changes["Changed"].append(cusoco)
+
+                    changes["Deleted"] = [cusoco for cusoco in old_sodas.keys() if cusoco not in new_sodas]
+                    changes["Changed"].sort()
+                    changes["Added"].sort()
+
+                if full:
+                    header_check_return = _header_check(header)
+                    if header_check_return:
+                        raise AutodexException(f"E131 Couldn't reload file: E095 Header: {header_check_return}")
+
+                    fida_check_return = fida_check(fida, header)
+                    if fida_check_return:
+                        raise AutodexException(f"E131 Couldn't reload file: E096 Fida: {fida_check_return}")
+
+                    old_cusocos = {soda["Cusoco"] for soda in self.fida}
+                    new_cusocos = {soda["Cusoco"] for soda in fida}
+                    changes["Added"] = sorted(new_cusocos - old_cusocos)
+                    changes["Changed"] = sorted(new_cusocos & old_cusocos)
+                    changes["Deleted"] = sorted(old_cusocos - new_cusocos)
+
+                else:
+                    check_return = self._replacement_check(
+                        [new_sodas[cusoco] for cusoco in changes["Changed"] + changes["Added"]],
+                        set(changes["Changed"] + changes["Deleted"]), header, datetime.datetime.now())
+                    if check_return:
+                        raise AutodexException(f"E131 Couldn't reload file: E096 Fida: {check_return}")
+
+                self.header = header
+                self.fida = fida
+                self.fingerprint = fingerprint
+
+                if full:
+                    self._index_rebuild()
+                    self._reset_versions()
+
+                else:
+                    for cusoco in changes["Deleted"] + changes["Changed"]:
+                        self._index_remove(old_sodas[cusoco])
+
+                    for cusoco in changes["Changed"] + changes["Added"]:
+                        self._index_add(new_sodas[cusoco])
+
+        return changes
+
+    def watch(self, interval: float = 1.0, callback=None) -> threading.Event:
+        """Reloads the file in a background thread whenever it changes. The callback gets the changes returned by
+        reload, or the exception if reloading failed. A missing file counts as not changed yet, since sync tools
+        often delete it before renaming the new one into place. Set the returned event to stop watching"""
+
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+
+                try:
+                    if not Path(self.path).exists() or not self.file_changed():
+                        continue
+
+                    changes = self.reload()
+
+                except FileNotFoundError:
+                    continue
+
+                except (AutodexException, OSError) as error:
+                    if not Path(self.path).exists():
+                        continue
+
+                    changes = error
+
+                if callback is not None:
+                    callback(changes)
+
+        threading.Thread(target=run, name=f"autodex watch {self.path}", daemon=True).start()
+
+        return stop
+
+
+class ReadOnlyStore:
+    """Read-only view of an indexed file through mmap. Only the header is decoded on open, sodas are decoded when
+    they're looked up or iterated, so opening takes the same time and memory regardless of the fida size"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise AutodexException(f"E146 Not an indexed file: {path}")
+
+        if len(self._map) < _indexed_prefix.size:
+            self.close()
+            raise AutodexException(f"E146 Not an indexed file: {path}")
+
+        (magic, version, self._encoding, _, source_size, source_mtime, header_length,
+         self._count) = _indexed_prefix.unpack_from(self._map, 0)
+
+        if magic != _indexed_magic or version not in (1, 2):
+            self.close()
+            raise AutodexException(f"E146 Not an indexed file: {path}")
+
+        # Version 1 has no content hash of the source
+        header_offset = _indexed_prefix.size
+        source_hash = None
+        if version == 2:
+            source_hash = self._map[header_offset:header_offset + _indexed_hash_size].hex()
+            header_offset += _indexed_hash_size
+
+        self.source = {"Size": source_size, "Mtime": source_mtime, "Hash": source_hash}
+        self._table_offset = header_offset + header_length
+
+        end = self._table_offset + self._count * _indexed_entry.size
+        if self._count and end <= len(self._map):
+            _, offset, length = self._entry(self._count - 1)
+            end = max(end, offset + length)
+
+        if end > len(self._map):
+            self.close()
+            raise AutodexException(f"E146 Indexed file is truncated: {path}")
+
+        try:
+            self.header = json.loads(self._map[header_offset:self._table_offset].decode("utf-8"))
+        except ValueError as error:
+            self.close()
+            raise AutodexException(f"E146 Invalid header in indexed file {path}: {error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._decode(index)
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+
+        self._file.close()
+
+    def _entry(self, index: int) -> tuple:
+        return _indexed_entry.unpack_from(self._map, self._table_offset + index * _indexed_entry.size)
+
+    def _decode(self, index: int) -> dict:
+        _, offset, length = self._entry(index)
+
+        return _decode_record(memoryview(self._map)[offset:offset + length], self._encoding)
+
+    def get_cusocos(self) -> List[int]:
+        """Returns all cusocos in ascending order, without decoding any soda"""
+
+        return [self._entry(index)[0] for index in range(self._count)]
+
+    def get_soda(self, cusoco: int) -> [dict, None]:
+        """Binary searches the cusoco table and decodes only the matching soda. None if the cusoco isn't used"""
+
+        low = 0
+        high = self._count
+
+        while low < high:
+            middle = (low + high) // 2
+            middle_cusoco = self._entry(middle)[0]
+
+            if middle_cusoco < cusoco:
+                low = middle + 1
+            elif middle_cusoco > cusoco:
+                high = middle
+            else:
+                return self._decode(middle)
+
+        return None
+
+    def get_fida(self) -> List[dict]:
+        """Decodes every soda. Iterate over the store instead to keep only one soda in memory at a time"""
+
+        return list(self)
+
+
+def open_read_only(path: str = _save_path) -> ReadOnlyStore:
+    """Opens a file read-only through mmap. Indexed files are opened directly. For JSON files, an indexed copy is
+    kept next to them as path + ".adex" and only rebuilt, after a full check, when the content hash of the JSON file
+    changed, or when the copy can't be opened"""
+
+    if _is_indexed_file(path):
+        return ReadOnlyStore(path)
+
+    indexed_path = path + ".adex"
+    source_hash = _fingerprint(path)["Hash"]
+
+    if Path(indexed_path).exists():
+        try:
+            store = ReadOnlyStore(indexed_path)
+        except AutodexException:
+            store = None
+
+        if store is not None and store.source["Hash"] == source_hash:
+            return store
+
+        if store is not None:
+            store.close()
+
+    with _locked_file(path, False):
+        try:
+            with _gc_paused():
+                stream = _checked_stream(path)
+                header = next(stream)
+                fida = list(stream)
+
+        except AutodexException as error:
+            raise AutodexException(f"E013 Couldn't load file: {error}")
+
+        fingerprint = _fingerprint(path)
+
+    _write_indexed_file(indexed_path, header, fida, fingerprint)
+
+    return ReadOnlyStore(indexed_path)
+
+
+_default_store = Store()
+
+
+def get_default_store() -> Store:
+    """Returns the store used by the module-level functions"""
+
+    return _default_store
+
+
+def change_numeric_attributes(
+        attribute: str,
+        operation:
+        Literal["change standard unit", "change unit bases", "rename", "merge", "add", "delete"],
+        commit: bool,
+        unit: str = None,
+        rename_to: str = None,
+        merge_into: str = None) -> [str, list, Literal[True]]:
+    """Change numeric attributes in the header. Makes changes to fida if required"""
+
+    return _default_store.change_numeric_attributes(attribute, operation, commit, unit, rename_to, merge_into)
+
+
+def add_soda(soda: dict, commit: bool) -> [str, list]:
+    """Creates a new soda in the default store's fida"""
+
+    return _default_store.add_soda(soda, commit)
+
+
+def delete_soda(cusoco: int, commit: bool) -> [str, list]:
+    """Deletes a soda in the default store's fida"""
+
+    return _default_store.delete_soda(cusoco, commit)
+
+
+def change_soda(cusoco: int, changed_soda: dict, commit: bool) -> [str, list]:
+    """Changes a soda in the default store's fida"""
+
+    return _default_store.change_soda(cusoco, changed_soda, commit)
+
+
+def prepare_add_soda(soda: dict) -> [str, PreparedOperation]:
+    """Validates adding a soda to the default store, and returns an operation for commit_prepared"""
+
+    return _default_store.prepare_add_soda(soda)
+
+
+def prepare_delete_soda(cusoco: int) -> [str, PreparedOperation]:
+    """Validates deleting a soda in the default store, and returns an operation for commit_prepared"""
+
+    return _default_store.prepare_delete_soda(cusoco)
+
+
+def prepare_change_soda(cusoco: int, changed_soda: dict) -> [str, PreparedOperation]:
+    """Validates changing a soda in the default store, and returns an operation for commit_prepared"""
+
+    return _default_store.prepare_change_soda(cusoco, changed_soda)
+
+
+def commit_prepared(prepared: PreparedOperation) -> [str, list]:
+    """Applies an operation prepared on the default store"""
+
+    return _default_store.commit_prepared(prepared)
+
+
+def get_soda(cusoco: int) -> [dict, None]:
+    """Copies the soda with the cusoco in the default store, None if there's none"""
+
+    return _default_store.get_soda(cusoco)
+
+
+def get_cusoco_by_name(name: str) -> [int, None]:
+    """Returns the cusoco of the soda with the name in the default store, None if there's none"""
+
+    return _default_store.get_cusoco_by_name(name)
+
+
+def query(conditions: [List[tuple], None] = None, sort: [str, None] = None, descending: bool = False,
+          limit: [int, None] = None, offset: int = 0) -> Query:
+    """Returns a query for sodas of the default store matching all conditions, see Query"""
+
+    return _default_store.query(conditions, sort, descending, limit, offset)
+
+
+def get_fida() -> List[dict]:
+    """Copies the default store's fida. Use this instead of working with the fida directly"""
+
+    return _default_store.get_fida()
+
+
+def save_file(path: [str, None] = None, fida: [list, None] = None, header: [dict, None] = None,
+              overwrite_external: bool = False, file_format: Literal["json", "snapshot", None] = None) -> [None, str]:
+    """Saves the default store's fida and header to the file at the path"""
+
+    return _default_store.save_file(path, fida, header, overwrite_external, file_format)
+
+
+def load_file(path: [str, None] = None, progress: [Callable[[int, int, int], None], None] = None) -> None:
+    """Loads contents of a file into the default store's header and fida"""
+
+    _default_store.load_file(path, progress)
+
+
+def reload() -> dict:
+    """Loads external changes of the default store's file"""
+
+    return _default_store.reload()
+
+
+def get_changed_between(start=None, end=None) -> List[int]:
+    """Returns cusocos of sodas in the default store last touched between start and end, oldest first"""
+
+    return _default_store.get_changed_between(start, end)
+
+
+def get_created_between(start=None, end=None) -> List[int]:
+    """Returns cusocos of sodas in the default store created between start and end, oldest first"""
+
+    return _default_store.get_created_between(start, end)
+
+
+def get_recently_touched(count: int = 10) -> List[int]:
+    """Returns cusocos of the most recently changed or created sodas in the default store, newest first"""
+
+    return _default_store.get_recently_touched(count)
+
+
+def export_delta(since=None, since_version: [int, None] = None) -> dict:
+    """Returns the changes of the default store after since or since_version"""
+
+    return _default_store.export_delta(since, since_version)
+
+
+def merge(other: [dict, list], commit: bool,
+          policy: [Literal["newer", "local", "remote"], Callable[[dict, dict], dict]] = "newer",
+          base: [list, None] = None) -> [str, dict]:
+    """Merges a delta or a full [header, fida] file into the default store"""
+
+    return _default_store.merge(other, commit, policy, base)
+
+
+def get_at(storage_unit: str, location: dict) -> [int, None]:
+    """Returns the cusoco of the container taking up a location in the default store, or None if it's free"""
+
+    return _default_store.get_at(storage_unit, location)
+
+
+def get_in_region(storage_unit: str, region: dict) -> List[int]:
+    """Returns cusocos of containers in the default store taking up any cell in a region"""
+
+    return _default_store.get_in_region(storage_unit, region)
 
-    header_check_return = _header_check(header)
-    if header_check_return:
-        raise AutodexException(f"E011 Header: {header_check_return}")
 
-    final_header = header.copy()
-    final_header["Last saved"] = datetime.datetime.now().strftime(header["Date format"])
+def get_occupancy(storage_unit: str) -> dict:
+    """Returns the occupancy grid and utilization of a storage unit in the default store"""
 
-    final_fida = sorted(fida.copy(), key=itemgetter("Cusoco"))
+    return _default_store.get_occupancy(storage_unit)
 
-    final_data = [final_header, final_fida]
 
-    temp_save_path = path + ".tmp"
+def autocomplete(prefix: str, count: int = 10) -> List[dict]:
+    """Returns up to count names and contents in the default store starting with prefix"""
 
-    with open(temp_save_path, "w", encoding="utf-8") as temp_file:
-        json.dump(final_data, temp_file, indent=2)
+    return _default_store.autocomplete(prefix, count)
 
-    file_check_return = _file_check(temp_save_path)
-    if file_check_return:
-        raise AutodexException(f"E012 Temp save file: {file_check_return}")
 
-    shutil.move(temp_save_path, _save_path)
+def get_numeric_range(attribute: str, low: [int, float, str, None] = None, high: [int, float, str, None] = None,
+                      unit: [str, None] = None) -> List[list]:
+    """Returns [value, cusoco] of all values of a numeric attribute in the default store between low and high"""
 
+    return _default_store.get_numeric_range(attribute, low, high, unit)
 
-def load_file(path: str = _save_path) -> None:
-    """Loads contents of a file into global_header and global_fida"""
 
-    global _global_header, _global_fida, _save_path
+def get_numeric_top(attribute: str, count: int = 10, highest: bool = True, unit: [str, None] = None) -> List[list]:
+    """Returns [value, cusoco] of the count sodas in the default store with the highest or lowest values"""
 
-    file_check_return = _file_check(path)
-    if file_check_return:
-        raise AutodexException(f"E013 Couldn't load file: {file_check_return}")
+    return _default_store.get_numeric_top(attribute, count, highest, unit)
 
-    with open(path, "r", encoding="utf-8") as file:
-        data = json.load(file)
 
-    _global_header = data[0]
-    _global_fida = data[1]
+def get_stats(verify: bool = False) -> dict:
+    """Returns counts and percentages about the default store"""
 
-    _save_path = path
+    return _default_store.get_stats(verify)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Union
+
+import autodex
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+_cache_path = ".autodex_cache"
+
+
+def _natural_key(name: str) -> list:
+    """Sorts img2 before img10"""
+
+    return [int(i) if i.isdigit() else i.lower() for i in re.split(r"(\d+)", name)]
+
+
+def _hash_file(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def build_manifest(folder_path: str, previous: [dict, None] = None) -> dict:
+    """Lists the image groups of an F3D folder with their frames in order, and size, modification time and content
+    hash of each frame. Hashes of frames unchanged since the previous manifest are reused instead of re-read"""
+
+    path = Path(folder_path)
+
+    if not path.is_dir():
+        raise autodex.AutodexException(f"E137 F3D folder path isn't a directory: {str(path.absolute())}")
+
+    known = {}
+    if previous is not None:
+        for group in previous["Groups"]:
+            for frame in group["Frames"]:
+                known[(group["Name"], frame["Name"])] = frame
+
+    groups = []
+    for group_path in sorted(path.iterdir(), key=lambda i: _natural_key(i.name)):
+
+        if not group_path.is_dir():
+            raise autodex.AutodexException(f"E138 F3D folder mustn't contain files: {str(path.absolute())}")
+
+        frames = []
+        for frame_path in sorted(group_path.iterdir(), key=lambda i: _natural_key(i.name)):
+
+            if frame_path.is_dir() or not frame_path.name.endswith(autodex._image_extensions):
+                raise autodex.AutodexException(f"E139 F3D image group must only contain image type files: "
+                                               f"{str(group_path.absolute())}")
+
+            stat = frame_path.stat()
+            frame = known.get((group_path.name, frame_path.name))
+
+            if frame is None or frame["Size"] != stat.st_size or frame["Mtime"] != stat.st_mtime_ns:
+                frame = {"Name": frame_path.name, "Size": stat.st_size, "Mtime": stat.st_mtime_ns,
+                         "Hash": _hash_file(frame_path)}
+
+            frames.append(frame)
+
+        groups.append({"Name": group_path.name, "Frames": frames})
+
+    return {"Path": str(path.absolute()), "Groups": groups}
+
+
+class ThumbnailCache:
+    """Content-addressed cache of downscaled F3D frames and frame strips. Files are named after the hash of what
+    they were made from, so unchanged frames are never decoded twice, even across folders"""
+
+    def __init__(self, cache_path: str = _cache_path, size: int = 256, workers: int = 4):
+        self.cache_path = Path(cache_path)
+        self.size = size
+        self.workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _file(self, kind: str, key: str, suffix: str) -> Path:
+        return self.cache_path / kind / key[:2] / f"{key}{suffix}"
+
+    @staticmethod
+    def _write(path: Path, write) -> None:
+        """Writes through a temporary file, so readers never see half-written files"""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+
+        write(temp_path)
+        os.replace(temp_path, path)
+
+    def get_manifest(self, folder_path: str) -> dict:
+        """Returns the manifest of an F3D folder, updating the cached one. Only new or changed frames are read"""
+
+        key = hashlib.sha256(str(Path(folder_path).absolute()).encode("utf-8")).hexdigest()
+        path = self._file("manifests", key, ".json")
+
+        previous = None
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as file:
+                previous = json.load(file)
+
+        manifest = build_manifest(folder_path, previous)
+
+        if manifest != previous:
+            def write(temp_path):
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    json.dump(manifest, file)
+
+            self._write(path, write)
+
+        return manifest
+
+    def _load_frame(self, source_path: Union[str, Path]):
+        if Image is None:
+            raise autodex.AutodexException("E140 Pillow is required for F3D thumbnails")
+
+        with Image.open(source_path) as image:
+            image.thumbnail((self.size, self.size))
+            image.load()
+
+        if image.mode != "RGB":
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.convert("RGBA").split()[3])
+            image = background
+
+        return image
+
+    def get_thumbnail(self, manifest: dict, group: int, frame: int) -> [Path, None]:
+        """Returns the path of a frame's thumbnail, creating it if needed. None for frames that can't be decoded,
+        like svg"""
+
+        group_dict = manifest["Groups"][group]
+        frame_dict = group_dict["Frames"][frame]
+
+        if frame_dict["Name"].endswith(".svg"):
+            return None
+
+        path = self._file("thumbnails", f"{frame_dict['Hash']}_{self.size}", ".jpg")
+
+        if not path.exists():
+            image = self._load_frame(Path(manifest["Path"]) / group_dict["Name"] / frame_dict["Name"])
+            self._write(path, lambda temp_path: image.save(temp_path, "JPEG", quality=85))
+
+        return path
+
+    def get_strip(self, manifest: dict, group: int) -> dict:
+        """Returns the path of an image with all frames of a group side by side in square cells, creating it if
+        needed. Rotating a preview only needs to move a crop window along the strip"""
+
+        group_dict = manifest["Groups"][group]
+        frames = group_dict["Frames"]
+
+        key = hashlib.sha256(" ".join([str(self.size)] + [i["Hash"] for i in frames]).encode("utf-8")).hexdigest()
+        path = self._file("strips", key, ".jpg")
+
+        if not path.exists():
+            if Image is None:
+                raise autodex.AutodexException("E140 Pillow is required for F3D thumbnails")
+
+            strip = Image.new("RGB", (self.size * max(1, len(frames)), self.size), "white")
+
+            for index in range(len(frames)):
+                thumbnail_path = self.get_thumbnail(manifest, group, index)
+
+                if thumbnail_path is None:
+                    continue
+
+                with Image.open(thumbnail_path) as thumbnail:
+                    strip.paste(thumbnail, (index * self.size + (self.size - thumbnail.width) // 2,
+                                            (self.size - thumbnail.height) // 2))
+
+            self._write(path, lambda temp_path: strip.save(temp_path, "JPEG", quality=85))
+
+        return {"Path": path, "Cell size": self.size, "Frames": len(frames)}
+
+    def prefetch(self, manifest: dict) -> List[Future]:
+        """Creates the strips of all groups in a background worker pool"""
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="autodex f3d")
+
+        return [self._executor.submit(self.get_strip, manifest, group) for group in range(len(manifest["Groups"]))]
+
+    def close(self) -> None:
+        """Waits for prefetching to finish and stops the worker pool"""
+
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
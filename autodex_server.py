@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import collections
+import copy
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Union
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import autodex
+
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+_max_body_size = 16 * 1024 * 1024
+
+
+class Counters:
+    """Request latency and throughput counters, per endpoint and in total"""
+
+    def __init__(self, window: int = 1000):
+        self.started = time.perf_counter()
+        self.window = window
+        self.endpoints = {}
+        self.recent = collections.deque(maxlen=window)
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        now = time.perf_counter()
+
+        counter = self.endpoints.setdefault(endpoint, {"count": 0, "total": 0.0, "max": 0.0,
+                                                       "latencies": collections.deque(maxlen=self.window)})
+        counter["count"] += 1
+        counter["total"] += seconds
+        counter["max"] = max(counter["max"], seconds)
+        counter["latencies"].append(seconds)
+
+        self.recent.append(now)
+
+    def report(self) -> dict:
+        now = time.perf_counter()
+        uptime = now - self.started
+
+        endpoints = {}
+        for endpoint, counter in self.endpoints.items():
+            latencies = sorted(counter["latencies"])
+
+            endpoints[endpoint] = {
+                "count": counter["count"],
+                "mean ms": counter["total"] / counter["count"] * 1000,
+                "p50 ms": latencies[len(latencies) // 2] * 1000,
+                "p99 ms": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000,
+                "max ms": counter["max"] * 1000}
+
+        total = sum(i["count"] for i in self.endpoints.values())
+
+        if len(self.recent) > 1 and now > self.recent[0]:
+            recent_per_second = len(self.recent) / (now - self.recent[0])
+        else:
+            recent_per_second = 0.0
+
+        return {"uptime s": uptime,
+                "requests": total,
+                "requests per second": total / uptime if uptime else 0.0,
+                "recent requests per second": recent_per_second,
+                "endpoints": endpoints}
+
+
+def _matches(soda: dict, text: str) -> bool:
+    """Checks if text is in name, description, contents or tags of a soda, ignoring case"""
+
+    if text in soda["Name"].lower() or text in soda["Description"].lower():
+        return True
+
+    for i in soda["Contents"] + soda["Tags"]:
+        if text in i.lower():
+            return True
+
+    return False
+
+
+def search(store: autodex.Store, text: str, limit: int = 100) -> list:
+    """Returns copies of sodas whose name, description, contents or tags contain text. The read lock is held, so
+    sodas aren't changed while they're compared and copied"""
+
+    text = text.strip().lower()
+
+    found = []
+    with store.lock.read():
+        for soda in store.get_fida():
+
+            if _matches(soda, text):
+                found.append(copy.deepcopy(soda))
+
+                if len(found) >= limit:
+                    break
+
+    return found
+
+
+def filter_fida(store: autodex.Store, storage_unit: str = None, container_type: str = None, tags: list = None,
+                categorical: dict = None, limit: int = 100) -> list:
+    """Returns copies of sodas that match every given value. Tags and categorical attribute values must all be
+    present"""
+
+    found = []
+    with store.lock.read():
+        for soda in store.get_fida():
+
+            if storage_unit is not None and soda["Storage unit"] != storage_unit:
+                continue
+
+            if container_type is not None and soda["Container type"] != container_type:
+                continue
+
+            if tags and not set(tags).issubset(soda["Tags"]):
+                continue
+
+            if categorical and not all(value in soda["Categorical attributes"].get(key, [])
+                                       for key, value in categorical.items()):
+                continue
+
+            found.append(copy.deepcopy(soda))
+
+            if len(found) >= limit:
+                break
+
+    return found
+
+
+def get_header(store: autodex.Store) -> dict:
+    """Copies the header, including the sections that are changed in place"""
+
+    with store.lock.read():
+        return copy.deepcopy(store.get_header())
+
+
+def lookup(store: autodex.Store, cusoco: int) -> [dict, str]:
+    """Returns the soda with the cusoco"""
+
+    soda = store.get_soda(cusoco)
+    if soda is None:
+        return "E123 Invalid cusoco"
+
+    return soda
+
+
+class Server:
+    """Local HTTP/JSON server keeping one store loaded. Store calls run in an executor so the event loop never
+    waits for validation or for the store lock"""
+
+    def __init__(self, store: autodex.Store, workers: int = 4):
+        self.store = store
+        self.counters = Counters()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autodex")
+
+    async def call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def route(self, method: str, target: str, body: [dict, list, None]) -> Tuple[int, str, dict]:
+        """Returns status, endpoint name and response of a request"""
+
+        split = urlsplit(target)
+        parts = [unquote(i) for i in split.path.split("/") if i]
+        query = {key: value[-1] for key, value in parse_qs(split.query).items()}
+        store = self.store
+
+        if parts == ["stats"] and method == "GET":
+            return 200, "stats", {"result": self.counters.report()}
+
+        if parts == ["header"] and method == "GET":
+            return 200, "header", {"result": await self.call(get_header, store)}
+
+        if parts == ["search"] and method == "GET":
+            result = await self.call(search, store, query.get("q", ""), int(query.get("limit", 100)))
+            return 200, "search", {"result": result}
+
+        if parts == ["filter"] and method == "GET":
+            tags = [i for i in query.get("tags", "").split(",") if i]
+            categorical = {key[len("attr."):]: value for key, value in query.items() if key.startswith("attr.")}
+
+            result = await self.call(filter_fida, store, query.get("storage_unit"), query.get("container_type"),
+                                     tags, categorical, int(query.get("limit", 100)))
+            return 200, "filter", {"result": result}
+
+        if parts == ["save"] and method == "POST":
+            await self.call(store.save_file)
+            return 200, "save", {"result": True}
+
+        if method in ("POST", "PATCH", "PUT") and parts and parts[0] == "sodas" and type(body) is not dict:
+            return 400, "invalid", {"error": f"E128 Invalid request: body must be an object, not {type(body).__name__}"}
+
+        if parts == ["sodas"] and method == "POST":
+            commit = query.get("commit", "true") == "true"
+            return self._wrap("add", await self.call(store.add_soda, body, commit))
+
+        if len(parts) == 2 and parts[0] == "sodas":
+            try:
+                cusoco = int(parts[1])
+            except ValueError:
+                return 400, "invalid", {"error": "E124 Cusoco must be int"}
+
+            commit = query.get("commit", "true") == "true"
+
+            if method == "GET":
+                return self._wrap("lookup", await self.call(lookup, store, cusoco))
+
+            if method in ("PATCH", "PUT"):
+                return self._wrap("change", await self.call(store.change_soda, cusoco, body, commit))
+
+            if method == "DELETE":
+                return self._wrap("delete", await self.call(store.delete_soda, cusoco, commit))
+
+            return 405, "invalid", {"error": f"E125 Method not allowed: {method}"}
+
+        return 404, "invalid", {"error": f"E126 Unknown endpoint: {method} {split.path}"}
+
+    @staticmethod
+    def _wrap(endpoint: str, result: Union[str, list, dict]) -> Tuple[int, str, dict]:
+        """Turns the error strings returned by autodex into 400 responses"""
+
+        if type(result) is str:
+            return 400, endpoint, {"error": result}
+
+        return 200, endpoint, {"result": result}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves requests of one connection until it's closed. Keeps the connection alive by default"""
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                start = time.perf_counter()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+
+                if length < 0:
+                    status, endpoint, response = 400, "invalid", {"error": "E128 Invalid request: bad Content-Length"}
+                    keep_alive = False
+
+                elif length > _max_body_size:
+                    status, endpoint, response = 413, "invalid", {"error": "E127 Request body too large"}
+                    keep_alive = False
+
+                else:
+                    raw_body = await reader.readexactly(length) if length else b""
+
+                    try:
+                        body = json.loads(raw_body) if raw_body else None
+                        status, endpoint, response = await self.route(method, target, body)
+
+                    except (json.decoder.JSONDecodeError, ValueError) as error:
+                        status, endpoint, response = 400, "invalid", {"error": f"E128 Invalid request: {error}"}
+
+                    except autodex.AutodexException as error:
+                        status, endpoint, response = 400, "invalid", {"error": str(error)}
+
+                    except Exception as error:
+                        status, endpoint, response = 500, "invalid", {"error": f"E129 {type(error).__name__}: {error}"}
+
+                payload = json.dumps(response).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {_reasons[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                             + payload)
+                await writer.drain()
+
+                self.counters.record(endpoint, time.perf_counter() - start)
+
+                if not keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+
+        async with server:
+            await server.serve_forever()
+
+
+async def serve(path: str = autodex._save_path, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Loads the file once in an executor, then serves the store until cancelled"""
+
+    store = autodex.Store(path)
+    server = Server(store)
+
+    await server.call(store.load_file)
+    await server.serve(host, port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve an autodex file over a local HTTP/JSON API")
+    parser.add_argument("path", nargs="?", default=autodex._save_path)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    arguments = parser.parse_args()
+
+    try:
+        asyncio.run(serve(arguments.path, arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -23,15 +23,16 @@ soda = {
 
 autodex.load_file()  # Load fida and header from file on disk into global variables.
 
-message = autodex.add_soda(soda, commit=False)
-# By doing commit=False, it doesn't actually add the soda, but returns errors as if it did.
+prepared = autodex.prepare_add_soda(soda)
+# Preparing doesn't actually add the soda, but returns errors as if it did.
 # This way we can see if there are problems with the soda.
 
-print(message)
+print(prepared)
 
-if type(message) is list:
+if type(prepared) is not str:
     if "y" == input("Add soda? (Y/N)").lower():
-        returned = autodex.add_soda(soda, commit=True)
+        returned = autodex.commit_prepared(prepared)
+        # Nothing changed since preparing, so the soda is added without being checked again.
 
         if type(returned) is list:
             print("Successful")